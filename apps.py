@@ -1,1112 +1,571 @@
+from collections import OrderedDict
 import dash
-from dash import dcc, html
-from dash.dependencies import Input, Output
-from plotly.subplots import make_subplots
-import plotly.express as px
-import pandas as pd
+from dash import callback, clientside_callback, ctx, dcc, html, no_update
+from dash.dependencies import ClientsideFunction, Input, Output, State
 import dash_bootstrap_components as dbc
-import datetime
+from data_source import DataSource
+from disk_cache import DiskFigureStore
+from figure_cache import FigureCache, cached_figure, figure_version
+from figure_pool import FigurePool
+import metrics
+from profiling import RequestProfiler
+from static_assets import HashedAssets
+from charts import chart_meta, client_payload, patch_chart, prepare_tables, render_chart
+from chart_specs import ANNUAL_AXIS, MONTHLY_AXIS, chart_spec, indicator_options
+import config
+import logging
+import threading
 import time
 
-# Create the Dash app without specifying any external stylesheets
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.QUARTZ], suppress_callback_exceptions=True)
-
-# Load the data from the CSV files
-fiscal_file_path = "/Users/hannahjumilla/Desktop/Dashboard/ng_fiscal_modified.csv"
-debt_file_path = "/Users/hannahjumilla/Desktop/Dashboard/NG_debt_modified.csv"
-
-df_fiscal = pd.read_csv(fiscal_file_path)
-df_debt = pd.read_csv(debt_file_path)
-
-# Define custom CSS for the dark blue header, dropdown menu, and animations
-custom_css = """
-.dark-blue-header {
-    background-color: #00008B !important; /* Dark Blue Color */
-}
-
-/* Dropdown menu font color */
-.Select-menu-outer {
-    color: black !important;
-}
-
-/* Animation for Welcome text */
-.welcome-text {
-    font-size: 6em;
-    color: white;
-    text-align: center;
-    margin-top: 1vh; /* Top margin 1vh */
-    animation: fadeIn 2s ease-in-out;
-}
-
-@keyframes fadeIn {
-    0% { opacity: 0; transform: translateY(-20px); }
-    100% { opacity: 1; transform: translateY(0); }
-}
-
-/* Animation for background gradient */
-@keyframes gradient {
-    0% {
-        background-position: 0% 50%;
-    }
-    50% {
-        background-position: 100% 50%;
-    }
-    100% {
-        background-position: 0% 50%;
-    }
-}
-
-.gradient-bg {
-    background: linear-gradient(45deg, #ff1b6b, #45caff, #ff1b6b, #45caff, #ff1b6b); /* Aurora-like gradient */
-    background-size: 400% 400%; /* Background size */
-    animation: gradient 15s ease infinite; /* Animation */
-    height: 100vh; /* Full height */
-    display: flex; /* Flexbox */
-    justify-content: center; /* Center horizontally */
-    align-items: center; /* Center vertically */
-    flex-direction: column; /* Align items vertically */
-    padding-top: 60px; /* Ensure content starts below the navbar */
-}
-
-/* Animation for typewriter text */
-@keyframes typing {
-    from { width: 0 }
-    to { width: 100% }
-}
-
-@keyframes blink-caret {
-    from, to { border-color: transparent }
-    50% { border-color: white }
-}
-
-.typewriter-text-container {
-    background-color: rgba(0, 0, 0, 0.3); /* More transparent semi-transparent black background */
-    padding: 20px; /* Padding around the text */
-    border-radius: 0px; /* Sharp corners */
-    max-width: 70%; /* Limit the width */
-    margin: 0 auto; /* Center horizontally */
-}
-
-.typewriter-text {
-    overflow: hidden; /* Hide overflow */
-    white-space: nowrap; /* Don't wrap text */
-    color: white;
-    letter-spacing: .15em; /* Spacing between characters */
-    animation: typing 3.5s steps(40, end), blink-caret .75s step-end infinite;
-    font-weight: bold; /* Make text bold */
-    text-align: center; /* Center align text */
-}
-
-/* Navbar link hover effect */
-.navbar-nav .nav-link {
-    transition: background-color 0.3s, color 0.3s;
-}
-
-.navbar-nav .nav-link:hover {
-    background-color: #0056b3; /* Change to a different shade of blue */
-    color: #ffffff; /* Change text color on hover */
-}
-
-/* Navbar link click effect */
-@keyframes clickEffect {
-    0% { background-color: #0056b3; }
-    50% { background-color: #00008B; }
-    100% { background-color: #0056b3; }
-}
-
-.navbar-nav .nav-link:active {
-    animation: clickEffect 0.3s;
-}
-
-/* Fade-in animation for the dashboard title */
-.fade-in {
-    animation: fadeInTitle 2s ease-in-out;
-}
-
-@keyframes fadeInTitle {
-    0% { opacity: 0; transform: translateY(-20px); }
-    100% { opacity: 1; transform: translateY(0); }
-}
-
-/* Custom styles for date and time */
-.date-time {
-    font-size: 2em;
-    color: white;
-    text-align: center;
-    margin-bottom: 1vh;
-}
-
-/* Styles for the information boxes */
-.info-box {
-    background-color: rgba(0, 0, 0, 0.3); /* Semi-transparent black background */
-    padding: 20px; /* Padding around the text */
-    border-radius: 5px; /* Rounded corners */
-    color: white;
-    font-size: 1.2em;
-    text-align: center;
-    margin: 10px;
-    flex: 1; /* Make the boxes equal width */
-    max-width: 45%; /* Limit the width */
-    animation: fadeInBox 2s ease-in-out;
-}
-
-/* Animation for the fade-in effect */
-@keyframes fadeInBox {
-    0% { opacity: 0; transform: translateY(20px); }
-    100% { opacity: 1; transform: translateY(0); }
-}
-"""
-
-app.index_string = f"""
-<!DOCTYPE html>
-<html>
-    <head>
-        {{%metas%}}
-        <title>{{%title%}}</title>
-        {{%favicon%}}
-        {{%css%}}
-        <style>{custom_css}</style>
-    </head>
-    <body>
-        {{%app_entry%}}
-        {{%config%}}
-        {{%scripts%}}
-        {{%renderer%}}
-    </body>
-</html>
-"""
+logger = logging.getLogger(__name__)
+
+# Load the data from the CSV files (see config.py for the paths), memory-mapped
+# from their compiled copies when BTR_COMPILED_DATA_DIR is set
+data_source = DataSource({
+    "fiscal": config.FISCAL_CSV,
+    "debt": config.DEBT_CSV,
+}, prepare=prepare_tables, compiled_dir=config.COMPILED_DATA_DIR)
+
+# Serialized chart figures, keyed on (figure version, callback, indicator, slider range)
+figure_cache = FigureCache(
+    config.FIGURE_CACHE_MAX_ENTRIES, config.FIGURE_CACHE_MAX_BYTES,
+    shared=DiskFigureStore(config.FIGURE_CACHE_DIR, config.FIGURE_CACHE_DISK_MAX_BYTES) if config.FIGURE_CACHE_DIR else None,
+)
+if figure_cache.shared is not None:
+    # Figures of other data files or an earlier release are never read again
+    for name in data_source.paths:
+        figure_cache.shared.discard_stale(name, figure_version(data_source.snapshot(), name))
+
+# Optional process pool for the figures built on cache misses (see figure_pool.py)
+figure_pool = FigurePool(data_source.paths, config.FIGURE_POOL_WORKERS, config.FIGURE_POOL_TIMEOUT,
+                         config.COMPILED_DATA_DIR) if config.FIGURE_POOL_WORKERS else None
+
+# Theme, custom CSS and scripts are served from assets/ under content-hashed URLs
+static_assets = HashedAssets()
 
 # Define the layout for the home page
-home_layout = html.Div([
-    # Navigation Bar
-    dbc.NavbarSimple(
-        children=[
-            dbc.NavItem(dbc.NavLink("Home", href="/")),
-            dbc.NavItem(dbc.NavLink("2006-2023", href="/data")),
-            dbc.NavItem(dbc.NavLink("2024", href="/2024")),
-        ],
-        brand="Financial Market Monitoring and Analysis Division",
-        brand_href="#",
-        className="dark-blue-header",  # Apply the custom dark blue class
-        dark=True,
-        fixed="top"  # Fix the navbar at the top
-    ),
-    html.Div(id="current-date-time", className="date-time"),  # Div to display date and time
-    html.H1("Welcome!", className="welcome-text"),
-    html.Div([
-        html.P("This dashboard shows the Fiscal and Debt Indicators for the years 2006 to 2024.", className="typewriter-text"),
-        html.P("Please click the buttons above to see the related charts.", className="typewriter-text")
-    ], className="typewriter-text-container"),
-    html.Div([
+def home_layout():
+    # Built when the home page is shown, like the other pages, not at import
+    return html.Div([
+        # Navigation Bar
+        dbc.NavbarSimple(
+            children=[
+                dbc.NavItem(dbc.NavLink("Home", href="/")),
+                dbc.NavItem(dbc.NavLink("2006-2023", href="/data")),
+                dbc.NavItem(dbc.NavLink("2024", href="/2024")),
+            ],
+            brand="Financial Market Monitoring and Analysis Division",
+            brand_href="#",
+            className="dark-blue-header",  # Apply the custom dark blue class
+            dark=True,
+            fixed="top"  # Fix the navbar at the top
+        ),
+        html.Div(id="current-date-time", className="date-time"),  # Div to display date and time
+        html.H1("Welcome!", className="welcome-text"),
         html.Div([
-            html.P("About the Fiscal Indicators"),
-            html.P("The Fiscal Indicators show data about the revenue, expenses, and amortization of the government among others.")
-        ], className="info-box fade-in"),
+            html.P("This dashboard shows the Fiscal and Debt Indicators for the years 2006 to 2024.", className="typewriter-text"),
+            html.P("Please click the buttons above to see the related charts.", className="typewriter-text")
+        ], className="typewriter-text-container"),
         html.Div([
-            html.P("About the Debt Indicators"),
-            html.P("The Debt Indicators show data about the government's debt, gross domestic product, the USD/PHP exchange rate, etc.")
-        ], className="info-box fade-in"),
-    ], style={"display": "flex", "justify-content": "center", "max-width": "70%", "margin": "0 auto"}),
-    dcc.Interval(
-        id="interval-component",
-        interval=1*1000,  # Update every second
-        n_intervals=0
-    )
-], className="gradient-bg")
-
-#Callback Time
-@app.callback(
+            html.Div([
+                html.P("About the Fiscal Indicators"),
+                html.P("The Fiscal Indicators show data about the revenue, expenses, and amortization of the government among others.")
+            ], className="info-box fade-in"),
+            html.Div([
+                html.P("About the Debt Indicators"),
+                html.P("The Debt Indicators show data about the government's debt, gross domestic product, the USD/PHP exchange rate, etc.")
+            ], className="info-box fade-in"),
+        ], style={"display": "flex", "justify-content": "center", "max-width": "70%", "margin": "0 auto"}),
+        dcc.Interval(
+            id="interval-component",
+            interval=1*1000,  # Update every second
+            n_intervals=0,
+            disabled=not config.LIVE_COMPONENTS  # Show the page-load time only
+        )
+    ], className="gradient-bg")
+
+#Callback Time (runs in the browser, so the ticking clock never calls the server)
+clientside_callback(
+    """
+    function(n) {
+        var now = new Date();
+        var pad = function(value) { return String(value).padStart(2, '0'); };
+        return now.getFullYear() + '-' + pad(now.getMonth() + 1) + '-' + pad(now.getDate()) + ' ' +
+            pad(now.getHours()) + ':' + pad(now.getMinutes()) + ':' + pad(now.getSeconds());
+    }
+    """,
     Output("current-date-time", "children"),
     [Input("interval-component", "n_intervals")]
 )
-def update_date_time(n):
-    now = datetime.datetime.now()
-    return now.strftime("%Y-%m-%d %H:%M:%S")
-
-# Define the app layout
-app.layout = html.Div([
-    dcc.Location(id='url', refresh=False),
-    html.Div(id='page-content')
-])
 
 # Define the layout for the main page (2006-2023)
-main_layout = html.Div([
-    # Navigation Bar
-    dbc.NavbarSimple(
-        children=[
-            dbc.NavItem(dbc.NavLink("Home", href="/")),
-            dbc.NavItem(dbc.NavLink("2006-2023", href="/data")),
-            dbc.NavItem(dbc.NavLink("2024", href="/2024")),
-        ],
-        brand="Financial Market Monitoring and Analysis Division",
-        brand_href="#",
-        className="dark-blue-header",  # Apply the custom dark blue class
-        dark=True,
-    ),
-    # Container for the content
-    dbc.Container([
-        dbc.Row([
-            dbc.Col([
-                html.H1("Fiscal and Debt Indicators Dashboard", className="text-center my-4 fade-in")
+def main_layout():
+    # The charts of the default selection are rendered into the page (from the
+    # figure cache), so the chart callback doesn't run on page load
+    selected_years = [2006, 2023]
+    fiscal_indicator, debt_indicator = 'Revenues', 'Outstanding debt'
+    snapshot = data_source.snapshot()
+    return html.Div([
+        # Navigation Bar
+        dbc.NavbarSimple(
+            children=[
+                dbc.NavItem(dbc.NavLink("Home", href="/")),
+                dbc.NavItem(dbc.NavLink("2006-2023", href="/data")),
+                dbc.NavItem(dbc.NavLink("2024", href="/2024")),
+            ],
+            brand="Financial Market Monitoring and Analysis Division",
+            brand_href="#",
+            className="dark-blue-header",  # Apply the custom dark blue class
+            dark=True,
+        ),
+        # Container for the content
+        dbc.Container([
+            dbc.Row([
+                dbc.Col([
+                    html.H1("Fiscal and Debt Indicators Dashboard", className="text-center my-4 fade-in")
+                ])
+            ]),
+            dbc.Row([
+                dbc.Col([
+                    html.Label("Select Fiscal Indicator", style={'font-weight': 'bold'}),
+                    dcc.Dropdown(
+                        id='fiscal-indicator-dropdown',
+                        options=indicator_options(snapshot.store("fiscal"), "fiscal"),
+                        value=fiscal_indicator,
+                        className="mb-4"
+                    )
+                ], width=6),
+                dbc.Col([
+                    html.Label("Select Debt Indicator", style={'font-weight': 'bold'}),
+                    dcc.Dropdown(
+                        id='debt-indicator-dropdown',
+                        options=indicator_options(snapshot.store("debt"), "debt"),
+                        value=debt_indicator,
+                        className="mb-4"
+                    )
+                ], width=6)
+            ]),
+            dbc.Row([
+                dbc.Col([
+                    html.Label("Select Years", style={'font-weight': 'bold'}),
+                    dcc.RangeSlider(
+                        id='year-slider',
+                        min=2006,
+                        max=2023,
+                        marks={year: {'label': str(year), 'style': {'color': 'black', 'font-weight': 'bold'}} for year in range(2006, 2024)},
+                        value=selected_years,
+                        step=None,
+                        className="mb-4"
+                    )
+                ], width=12)
+            ]),
+            dbc.Row([
+                dbc.Col([
+                    chart_graph('fiscal-chart', update_fiscal_chart(selected_years, fiscal_indicator))
+                ], width=6),
+                dbc.Col([
+                    chart_graph('debt-chart', update_debt_chart(selected_years, debt_indicator))
+                ], width=6)
             ])
-        ]),
-        dbc.Row([
-            dbc.Col([
-                html.Label("Select Fiscal Indicator", style={'font-weight': 'bold'}),
-                dcc.Dropdown(
-                    id='fiscal-indicator-dropdown',
-                    options=[
-                        {'label': indicator, 'value': indicator}
-                        for indicator in df_fiscal['Fiscal Indicators'].unique()
-                        if indicator not in ["BIR collections", "BOC collections", "BTr income",
-                                             "Domestic financing 1", "External financing 1", 
-                                             "Domestic financing  2", "External financing 2",
-                                             "Domestic financing 3", "External financing 3",'Domestic amortization','External amortization','As share of revenues (percent)','As share of expenditures (percent)','As share of GDP (percent)']
-                    ],
-                    value='Revenues',
-                    className="mb-4"
-                )
-            ], width=6),
-            dbc.Col([
-                html.Label("Select Debt Indicator", style={'font-weight': 'bold'}),
-                dcc.Dropdown(
-                    id='debt-indicator-dropdown',
-                    options=[
-                        {'label': indicator, 'value': indicator}
-                        for indicator in df_debt['Debt Indicators'].unique()
-                        if indicator not in ["Domestic debt", "External debt", "Domestic guarantees",
-                                             "External guarantees", "On domestic debt", "On external debt", "Debt Indicators (continued)","Short-term debt, <1 year (type 1)",
-            "Medium-term debt, 1 year to 5 years (type 1)","Long-term debt, >5 years (type 1)","Short-term debt, <1 year (type 2)",
-            "Medium-term debt, 1 year to 5 years (type 2)",
-            "Long-term debt, >5 years (type 2)","Philippine peso (PHP)",
-            "US dollar (USD)",
-            "Japanese yen (JPY)",
-            "Euro (EUR)",
-            "Chinese renminbi (CNY)",
-            "Other currencies 1","PHP",
-            "USD",
-            "JPY",
-            "EUR",
-            "CNY","Memo items:", "Other currencies 2"]
-                    ],
-                    value='Outstanding debt',
-                    className="mb-4"
-                )
-            ], width=6)
-        ]),
-        dbc.Row([
-            dbc.Col([
-                html.Label("Select Years", style={'font-weight': 'bold'}),
-                dcc.RangeSlider(
-                    id='year-slider',
-                    min=2006,
-                    max=2023,
-                    marks={year: {'label': str(year), 'style': {'color': 'black', 'font-weight': 'bold'}} for year in range(2006, 2024)},
-                    value=[2006, 2023],
-                    step=None,
-                    className="mb-4"
-                )
-            ], width=12)
-        ]),
-        dbc.Row([
-            dbc.Col([
-                dcc.Graph(id='fiscal-chart')
-            ], width=6),
-            dbc.Col([
-                dcc.Graph(id='debt-chart')
-            ], width=6)
         ])
     ])
-])
-# Define the layout for the 2024 page
-layout_2024 = html.Div([
-    # Navigation Bar
-    dbc.NavbarSimple(
-        children=[
-            dbc.NavItem(dbc.NavLink("Home", href="/")),
-            dbc.NavItem(dbc.NavLink("2006-2023", href="/data")),
-            dbc.NavItem(dbc.NavLink("2024", href="/2024")),
-        ],
-        brand="Financial Market Monitoring and Analysis Division",
-        brand_href="#",
-        className="dark-blue-header",  # Apply the custom dark blue class
-        dark=True,
-    ),
-    # Container for the content
-    dbc.Container([
-        dbc.Row([
-            dbc.Col([
-                html.H1("Fiscal and Debt Indicators Dashboard - 2024", className="text-center my-4 fade-in")
+
+
+def chart_graph(graph_id, figure):
+    # A chart and, next to it, the layout.meta of the figure it shows (see
+    # page_chart), so slider moves don't have to send the figure back
+    return html.Div([
+        dcc.Graph(id=graph_id, figure=figure),
+        dcc.Store(id=graph_id + '-meta', data=figure['layout'].get('meta')),
+    ])
+
+
+# Define the layout for the 2024 page; the slider steps through that year's months and quarters
+page_year_2024 = 2024
+
+
+def layout_2024():
+    snapshot = data_source.snapshot()
+    periods_2024 = snapshot.store("fiscal").subannual_labels(page_year_2024)
+    selected_period = [1, len(periods_2024)]
+    fiscal_indicator, debt_indicator = 'Revenues', 'Outstanding debt'
+    return html.Div([
+        # Navigation Bar
+        dbc.NavbarSimple(
+            children=[
+                dbc.NavItem(dbc.NavLink("Home", href="/")),
+                dbc.NavItem(dbc.NavLink("2006-2023", href="/data")),
+                dbc.NavItem(dbc.NavLink("2024", href="/2024")),
+            ],
+            brand="Financial Market Monitoring and Analysis Division",
+            brand_href="#",
+            className="dark-blue-header",  # Apply the custom dark blue class
+            dark=True,
+        ),
+        # Container for the content
+        dbc.Container([
+            dbc.Row([
+                dbc.Col([
+                    html.H1("Fiscal and Debt Indicators Dashboard - 2024", className="text-center my-4 fade-in")
+                ])
+            ]),
+            dbc.Row([
+                            dbc.Col([
+                    html.Label("Select Fiscal Indicator", style={'font-weight': 'bold'}),
+                    dcc.Dropdown(
+                        id='fiscal-indicator-dropdown-2024',
+                        options=indicator_options(snapshot.store("fiscal"), "fiscal"),
+                        value=fiscal_indicator,
+                        className="mb-4"
+                    )
+                ], width=6),
+                dbc.Col([
+                    html.Label("Select Debt Indicator", style={'font-weight': 'bold'}),
+                    dcc.Dropdown(
+                        id='debt-indicator-dropdown-2024',
+                        options=indicator_options(snapshot.store("debt"), "debt"),
+                        value=debt_indicator,
+                        className="mb-4"
+                    )
+                ], width=6)
+            ]),
+            dbc.Row([
+                dbc.Col([
+                    html.Label("Select Time Periods", style={'font-weight': 'bold'}),
+                    dcc.RangeSlider(
+                        id='period-slider-2024',
+                        min=1,
+                        max=len(periods_2024),
+                        marks={i: {'label': period, 'style': {'color': 'black', 'font-weight': 'bold'}} for i, period in enumerate(periods_2024, start=1)},
+                        value=selected_period,
+                        step=None,
+                        className="mb-4"
+                    )
+                ], width=12)
+            ]),
+            dbc.Row([
+                dbc.Col([
+                    chart_graph('fiscal-chart-2024', update_fiscal_chart_2024(selected_period, fiscal_indicator))
+                ], width=6),
+                dbc.Col([
+                    chart_graph('debt-chart-2024', update_debt_chart_2024(selected_period, debt_indicator))
+                ], width=6)
             ])
-        ]),
-        dbc.Row([
-                        dbc.Col([
-                html.Label("Select Fiscal Indicator", style={'font-weight': 'bold'}),
-                dcc.Dropdown(
-                    id='fiscal-indicator-dropdown-2024',
-                    options=[
-                        {'label': indicator, 'value': indicator}
-                        for indicator in df_fiscal['Fiscal Indicators'].unique()
-                        if indicator not in ["BIR collections", "BOC collections", "BTr income",
-                                             "Domestic financing 1", "External financing 1", 
-                                             "Domestic financing  2", "External financing 2",
-                                             "Domestic financing 3", "External financing 3",'Domestic amortization','External amortization','As share of revenues (percent)','As share of expenditures (percent)','As share of GDP (percent)']
-                    ],
-                    value='Revenues',
-                    className="mb-4"
-                )
-            ], width=6),
-            dbc.Col([
-                html.Label("Select Debt Indicator", style={'font-weight': 'bold'}),
-                dcc.Dropdown(
-                    id='debt-indicator-dropdown-2024',
-                    options=[
-                        {'label': indicator, 'value': indicator}
-                        for indicator in df_debt['Debt Indicators'].unique()
-                        if indicator not in ["Domestic debt", "External debt", "Domestic guarantees",
-                                             "External guarantees", "On domestic debt", "On external debt", "Debt Indicators (continued)","Short-term debt, <1 year (type 1)",
-            "Medium-term debt, 1 year to 5 years (type 1)","Long-term debt, >5 years (type 1)","Short-term debt, <1 year (type 2)",
-            "Medium-term debt, 1 year to 5 years (type 2)",
-            "Long-term debt, >5 years (type 2)","Philippine peso (PHP)",
-            "US dollar (USD)",
-            "Japanese yen (JPY)",
-            "Euro (EUR)",
-            "Chinese renminbi (CNY)",
-            "Other currencies","PHP",
-            "USD",
-            "JPY",
-            "EUR",
-            "CNY","Memo items:"]
-                    ],
-                    value='Outstanding debt',
-                    className="mb-4"
-                )
-            ], width=6)
-        ]),
-        dbc.Row([
-            dbc.Col([
-                html.Label("Select Time Periods", style={'font-weight': 'bold'}),
-                dcc.RangeSlider(
-                    id='period-slider-2024',
-                    min=1,
-                    max=4,
-                    marks={
-                        1: {'label': 'Jan-2024', 'style': {'color': 'black', 'font-weight': 'bold'}},
-                        2: {'label': 'Feb-2024', 'style': {'color': 'black', 'font-weight': 'bold'}},
-                        3: {'label': 'Mar-2024', 'style': {'color': 'black', 'font-weight': 'bold'}},
-                        4: {'label': '1Q2024', 'style': {'color': 'black', 'font-weight': 'bold'}}
-                    },
-                    value=[1, 4],
-                    step=None,
-                    className="mb-4"
-                )
-            ], width=12)
-        ]),
-        dbc.Row([
-            dbc.Col([
-                dcc.Graph(id='fiscal-chart-2024')
-            ], width=6),
-            dbc.Col([
-                dcc.Graph(id='debt-chart-2024')
-            ], width=6)
         ])
     ])
-])
+
+
+_chart_payload = {}
+
+
+def chart_payload():
+    # Data for the clientside charts, rebuilt only when a CSV file changes
+    snapshot = data_source.snapshot()
+    versions = (snapshot.version("fiscal"), snapshot.version("debt"))
+    if versions not in _chart_payload:
+        _chart_payload.clear()
+        _chart_payload[versions] = client_payload({
+            "fiscal": snapshot.store("fiscal"),
+            "debt": snapshot.store("debt"),
+        }, pageYear2024=page_year_2024)
+    return _chart_payload[versions]
+
 
 # Define the app layout to include the page container
-app.layout = html.Div([
-    dcc.Location(id='url', refresh=False),
-    html.Div(id='page-content')
-])
+def serve_layout():
+    children = [
+        dcc.Location(id='url', refresh=False),
+        html.Div(id='page-content')
+    ]
+    if config.CLIENTSIDE_CHARTS:
+        # The browser keeps its copy of the data in localStorage and only
+        # downloads it again when the hash sent with the page changes
+        children += [
+            dcc.Store(id='chart-data-version', data=chart_payload()["hash"]),
+            dcc.Store(id='chart-data', storage_type='local'),
+            dcc.Store(id='chart-data-hash', storage_type='local'),
+        ]
+    return html.Div(children)
 
 
 # Update the page content based on the URL
-@app.callback(Output('page-content', 'children'),
+@callback(Output('page-content', 'children'),
               [Input('url', 'pathname')])
+@metrics.timed_callback
 def display_page(pathname):
     if pathname == '/data':
-        return main_layout
+        return main_layout()
     elif pathname == '/2024':
-        return layout_2024
+        return layout_2024()
     else:
-        return home_layout
-    
-# Define the callback to update the fiscal chart based on the selected year and indicator
-@app.callback(
-    Output('fiscal-chart', 'figure'),
-    [
-        Input('year-slider', 'value'),
-        Input('fiscal-indicator-dropdown', 'value')
-    ]
-)
-def update_fiscal_chart(selected_years, selected_indicator):
-    start_year, end_year = selected_years
-    df_selected = df_fiscal
-    
-    if selected_indicator == "Revenues":
-        sliced_df = df_selected[df_selected["Fiscal Indicators"].isin([
-            "BIR collections",
-            "BOC collections",
-            "BTr income"
-        ])]
-        melted_df = sliced_df.melt(id_vars=["Fiscal Indicators"], var_name="Year", value_name="Value")
-        selected_year_df = melted_df[(melted_df["Year"] >= str(start_year)) & (melted_df["Year"] <= str(end_year))]
-        selected_year_df.groupby("Year").apply(lambda x: x.sort_values(by=["Value"], ascending=[False])).reset_index(drop=True)
-        fig = px.bar(
-            selected_year_df,
-            x="Year",
-            y="Value",
-            color="Fiscal Indicators",
-            title=f"Revenues for {start_year}-{end_year}",
-            text_auto=True,
-            barmode='stack'
-        )
-        fig.update_layout(yaxis=dict(type='linear'))
-    elif selected_indicator == "Gross financing":
-        sliced_df = df_selected[df_selected["Fiscal Indicators"].isin([
-            "Domestic financing 1",
-            "External financing 1",
-        ])]
-        melted_df = sliced_df.melt(id_vars=["Fiscal Indicators"], var_name="Year", value_name="Value")
-        selected_year_df = melted_df[(melted_df["Year"] >= str(start_year)) & (melted_df["Year"] <= str(end_year))]
-        selected_year_df = selected_year_df.groupby("Year").apply(lambda x: x.sort_values(by=["Value"], ascending=[False])).reset_index(drop=True)
-        fig = px.bar(
-            selected_year_df,
-            x="Year",
-            y="Value",
-            color="Fiscal Indicators",
-            title=f"Gross financing for {start_year}-{end_year}",
-            text_auto=True,
-            barmode='stack'
-        )
-        fig.update_layout(yaxis=dict(type='linear'))
-    
-    elif selected_indicator == "Amortization":
-        sliced_df = df_selected[df_selected["Fiscal Indicators"].isin([
-            "Domestic amortization", "External amortization"
-        ])]
-        melted_df = sliced_df.melt(id_vars=["Fiscal Indicators"], var_name="Year", value_name="Value")
-        selected_year_df = melted_df[(melted_df["Year"] >= str(start_year)) & (melted_df["Year"] <= str(end_year))]
-        selected_year_df = selected_year_df.groupby("Year").apply(lambda x: x.sort_values(by=["Value"], ascending=[False])).reset_index(drop=True)
-        fig = px.bar(
-            selected_year_df,
-            x="Year",
-            y="Value",
-            color="Fiscal Indicators",
-            title=f"Amortization for {start_year}-{end_year}",
-            text_auto=True,
-            barmode='stack'
-        )
-        fig.update_layout(yaxis=dict(type='linear'))
-    elif selected_indicator == "Interest payments":
-        sliced_df = df_selected[df_selected["Fiscal Indicators"].isin([
-            "As share of revenues (percent)",
-            "As share of expenditures (percent)",            
-            "As share of GDP (percent)",
-
-        ])]
-        melted_df = sliced_df.melt(id_vars=["Fiscal Indicators"], var_name="Year", value_name="Value")
-        selected_year_df = melted_df[(melted_df["Year"] >= str(start_year)) & (melted_df["Year"] <= str(end_year))]
-        selected_year_df["Value"] = pd.to_numeric(selected_year_df["Value"].str.replace(',', ''), errors='coerce')
-        selected_year_df = selected_year_df.dropna(subset=["Value"])
-    
-        fig = make_subplots(rows=1, cols=len(range(start_year, end_year + 1)), subplot_titles=[str(year) for year in range(start_year, end_year + 1)], specs=[[{'type': 'pie'}]*len(range(start_year, end_year + 1))])
-
-        for i, year in enumerate(range(start_year, end_year + 1)):
-            year_df = selected_year_df[selected_year_df["Year"] == str(year)]
-            fig.add_trace(
-                px.pie(
-                    year_df,
-                    names="Fiscal Indicators",
-                    values="Value",
-                    title=f"Interest payments for {year}"
-                ).data[0],
-                row=1, col=i+1
-            )
-
-        fig.update_layout(title_text=f"Interest payments for {start_year}-{end_year}")
-        return fig
-    
-    elif selected_indicator == "Financing mix (percent distribution of gross borrowing)":
-        sliced_df = df_selected[df_selected["Fiscal Indicators"].isin([
-            "Domestic financing  2",
-            "External financing 2",
-        ])]
-        melted_df = sliced_df.melt(id_vars=["Fiscal Indicators"], var_name="Year", value_name="Value")
-        selected_year_df = melted_df[(melted_df["Year"] >= str(start_year)) & (melted_df["Year"] <= str(end_year))]
-        selected_year_df["Value"] = pd.to_numeric(selected_year_df["Value"].str.replace(',', ''), errors='coerce')
-        selected_year_df = selected_year_df.dropna(subset=["Value"])
-    
-        fig = make_subplots(rows=1, cols=len(range(start_year, end_year + 1)), subplot_titles=[str(year) for year in range(start_year, end_year + 1)], specs=[[{'type': 'pie'}]*len(range(start_year, end_year + 1))])
-
-        for i, year in enumerate(range(start_year, end_year + 1)):
-            year_df = selected_year_df[selected_year_df["Year"] == str(year)]
-            fig.add_trace(
-                px.pie(
-                    year_df,
-                    names="Fiscal Indicators",
-                    values="Value",
-                    title=f"Financing mix (percent distribution of gross borrowing) for {year}"
-                ).data[0],
-                row=1, col=i+1
-            )
-
-        fig.update_layout(title_text=f"Financing mix (percent distribution of gross borrowing) {start_year}-{end_year}")
-        return fig
+        return home_layout()
     
+# The columns of a slider range, as (IndicatorStore method, arguments)
+def annual_columns(selected_years):
+    return ("annual_range", tuple(selected_years))
+
+def columns_2024(selected_period):
+    # Slider positions count the months and quarters of the page year
+    return ("subannual_range", (page_year_2024, *selected_period))
+
+
+def update_chart(snapshot, dataset, selected_indicator, columns, axis, render=render_chart):
+    store = snapshot.store(dataset)
+    method, args = columns
+    meta = chart_meta(dataset, selected_indicator, snapshot.version(dataset))
+    return render(store, chart_spec(dataset, selected_indicator), getattr(store, method)(*args), axis, meta)
+
+
+def build_chart(snapshot, dataset, selected_indicator, columns, axis):
+    # A cache miss: build in the figure pool when there is one, else here
+    if figure_pool is not None:
+        with metrics.phase("pool"):
+            payload = figure_pool.build(dataset, snapshot.version(dataset), selected_indicator, columns, axis)
+        if payload is not None:
+            return payload
+    return update_chart(snapshot, dataset, selected_indicator, columns, axis)
+
+
+# Chart builders, one per graph; each is a pure function of (slider range, indicator)
+@cached_figure(figure_cache, data_source, "fiscal")
+def update_fiscal_chart(selected_years, selected_indicator, snapshot):
+    return build_chart(snapshot, "fiscal", selected_indicator, annual_columns(selected_years), ANNUAL_AXIS)
+
+@cached_figure(figure_cache, data_source, "debt")
+def update_debt_chart(selected_years, selected_indicator, snapshot):
+    return build_chart(snapshot, "debt", selected_indicator, annual_columns(selected_years), ANNUAL_AXIS)
+
+@cached_figure(figure_cache, data_source, "fiscal")
+def update_fiscal_chart_2024(selected_period, selected_indicator, snapshot):
+    return build_chart(snapshot, "fiscal", selected_indicator, columns_2024(selected_period), MONTHLY_AXIS)
+
+@cached_figure(figure_cache, data_source, "debt")
+def update_debt_chart_2024(selected_period, selected_indicator, snapshot):
+    return build_chart(snapshot, "debt", selected_indicator, columns_2024(selected_period), MONTHLY_AXIS)
+
+
+def page_chart(snapshot, dataset, update, selected_range, indicator, meta, columns, axis, patch):
+    # One chart of a page and its new meta (the stamp of the figure shown, see
+    # chart_meta). An error here leaves the chart as it is in the browser,
+    # without failing the other chart of the same response.
+    try:
+        if patch and meta == chart_meta(dataset, indicator, snapshot.version(dataset)):
+            # Only the range changed, and the browser has this chart built from
+            # the same data: patch its data and title (pie grids have no patch
+            # and are rebuilt)
+            fig = update_chart(snapshot, dataset, indicator, columns(selected_range), axis, render=patch_chart)
+            if fig is not None:
+                return fig, no_update
+        fig = update(selected_range, indicator)
+        return fig, fig['layout'].get('meta')
+    except Exception:
+        logger.exception("Could not update the %s chart for %r over %r", dataset, indicator, selected_range)
+        return no_update, no_update
+
+
+def update_page_charts(selected_range, fiscal_indicator, debt_indicator, fiscal_meta, debt_meta,
+                       fiscal_dropdown, debt_dropdown, update_fiscal, update_debt, columns, axis):
+    # One request per interaction: a slider move rebuilds both charts, a dropdown
+    # change only its own chart and leaves the other one untouched in the browser
+    triggered = ctx.triggered_id
+    patch = triggered not in (None, fiscal_dropdown, debt_dropdown)
+    snapshot = data_source.snapshot()
+    fiscal_fig = debt_fig = no_update
+    if triggered != debt_dropdown:
+        fiscal_fig, fiscal_meta = page_chart(snapshot, "fiscal", update_fiscal, selected_range, fiscal_indicator,
+                                             fiscal_meta, columns, axis, patch)
     else:
-        melted_df = df_selected.melt(id_vars=["Fiscal Indicators"], var_name="Year", value_name="Value")
-        selected_year_df = melted_df[(melted_df["Year"] >= str(start_year)) & (melted_df["Year"] <= str(end_year))]
-        selected_year_df["Value"] = pd.to_numeric(selected_year_df["Value"].str.replace('[^\d.-]', '', regex=True), errors='coerce')
-        selected_year_df = selected_year_df.dropna(subset=["Value"])
-        selected_year_df = selected_year_df.sort_values(by="Year")
-        fig = px.line(
-            selected_year_df[selected_year_df["Fiscal Indicators"] == selected_indicator],
-            x="Year",
-            y="Value",
-            title=f'{selected_indicator} over Time',
-            markers=True
-        )
-        fig.update_yaxes(rangemode='tozero')
-
-    return fig
-
-#Define the callback for debt indicators 2006 to 2023
-@app.callback(
-    Output('debt-chart', 'figure'),
-    [Input('year-slider', 'value'),
-     Input('debt-indicator-dropdown', 'value')]
-)
-def update_debt_chart(selected_years, selected_indicator):
-    start_year, end_year = selected_years
-    df_selected = df_debt
-
-    if selected_indicator == "Outstanding debt":
-        sliced_df = df_selected[df_selected["Debt Indicators"].isin([
-            "Domestic debt",
-            "External debt"
-        ])]
-        melted_df = sliced_df.melt(id_vars=["Debt Indicators"], var_name="Year", value_name="Value")
-        selected_year_df = melted_df[(melted_df["Year"] >= str(start_year)) & (melted_df["Year"] <= str(end_year))]
-        selected_year_df["Value"] = pd.to_numeric(selected_year_df["Value"].str.replace(',', ''), errors='coerce')
-        selected_year_df = selected_year_df.dropna(subset=["Value"])
-        selected_year_df = selected_year_df.groupby("Year").apply(lambda x: x.sort_values(by=["Value"], ascending=[False])).reset_index(drop=True)
-        fig = px.bar(
-            selected_year_df,
-            x="Year",
-            y="Value",
-            color="Debt Indicators",
-            title=f"Outstanding debt for {start_year}-{end_year}",
-            text_auto=True,
-            barmode='stack'
-        )
-        fig.update_layout(yaxis=dict(type='linear'))
-
-    elif selected_indicator == "Distribution by maturity type 3/":
-        sliced_df = df_selected[df_selected["Debt Indicators"].isin([
-            "Short-term debt, <1 year (type 1)",
-            "Medium-term debt, 1 year to 5 years (type 1)",
-            "Long-term debt, >5 years (type 1)"
-        ])]
-        melted_df = sliced_df.melt(id_vars=["Debt Indicators"], var_name="Year", value_name="Value")
-        selected_year_df = melted_df[(melted_df["Year"] >= str(start_year)) & (melted_df["Year"] <= str(end_year))]
-        selected_year_df["Value"] = pd.to_numeric(selected_year_df["Value"].str.replace(',', ''), errors='coerce')
-        selected_year_df = selected_year_df.dropna(subset=["Value"])
-        selected_year_df = selected_year_df.groupby("Year").apply(lambda x: x.sort_values(by=["Value"], ascending=[False])).reset_index(drop=True)
-        fig = px.bar(
-            selected_year_df,
-            x="Year",
-            y="Value",
-            color="Debt Indicators",
-            title=f"Distribution by maturity type 3/ for {start_year}-{end_year}",
-            text_auto=True,
-            barmode='stack'
-        )
-        fig.update_layout(
-            yaxis=dict(type='linear'),
-            legend=dict(
-                font=dict(size=10),  # Adjust the size as needed
-                title_font=dict(size=5)  # Adjust the size as needed
-            )
-        )
-
-    elif selected_indicator == "Debt guaranteed by the NG":
-        sliced_df = df_selected[df_selected["Debt Indicators"].isin([
-            "Domestic guarantees",
-            "External guarantees"
-        ])]
-        melted_df = sliced_df.melt(id_vars=["Debt Indicators"], var_name="Year", value_name="Value")
-        selected_year_df = melted_df[(melted_df["Year"] >= str(start_year)) & (melted_df["Year"] <= str(end_year))]
-        selected_year_df["Value"] = pd.to_numeric(selected_year_df["Value"].str.replace(',', ''), errors='coerce')
-        selected_year_df = selected_year_df.dropna(subset=["Value"])
-        selected_year_df = selected_year_df.groupby("Year").apply(lambda x: x.sort_values(by=["Value"], ascending=[False])).reset_index(drop=True)
-        fig = px.bar(
-            selected_year_df,
-            x="Year",
-            y="Value",
-            color="Debt Indicators",
-            title=f"Debt guaranteed by the NG for {start_year}-{end_year}",
-            text_auto=True,
-            barmode='stack'
-        )
-        fig.update_layout(yaxis=dict(type='linear'))
-
-    elif selected_indicator == "Total debt by currency (in billion pesos)":
-        sliced_df = df_selected[df_selected["Debt Indicators"].isin([
-            "Philippine peso (PHP)",
-            "US dollar (USD)",
-            "Japanese yen (JPY)",
-            "Euro (EUR)",
-            "Chinese renminbi (CNY)",
-            "Other currencies 1"
-        ])]
-        melted_df = sliced_df.melt(id_vars=["Debt Indicators"], var_name="Year", value_name="Value")
-        selected_year_df = melted_df[(melted_df["Year"] >= str(start_year)) & (melted_df["Year"] <= str(end_year))]
-        selected_year_df["Value"] = pd.to_numeric(selected_year_df["Value"].str.replace(',', ''), errors='coerce')
-        selected_year_df = selected_year_df.dropna(subset=["Value"])
-        fig = px.line(
-            selected_year_df,
-            x="Year",
-            y="Value",
-            color="Debt Indicators",
-            title=f"Total debt by currency (in billion pesos) for {start_year}-{end_year}",
-            markers=True
-        )
-        fig.update_layout(yaxis=dict(type='linear'))
-        fig.update_yaxes(rangemode='tozero')  # Set rangemode to 'tozero' for line charts
-
-    elif selected_indicator == "Total debt by currency (percent of total)":
-        sliced_df = df_selected[df_selected["Debt Indicators"].isin([
-            "PHP",
-            "USD",
-            "JPY",
-            "EUR",
-            "CNY",
-            "Other currencies 2"
-        ])]
-        melted_df = sliced_df.melt(id_vars=["Debt Indicators"], var_name="Year", value_name="Value")
-        selected_year_df = melted_df[(melted_df["Year"] >= str(start_year)) & (melted_df["Year"] <= str(end_year))]
-        selected_year_df["Value"] = pd.to_numeric(selected_year_df["Value"].str.replace(',', ''), errors='coerce')
-        selected_year_df = selected_year_df.dropna(subset=["Value"])
-
-        fig = make_subplots(
-            rows=1,
-            cols=len(range(start_year, end_year + 1)),
-            subplot_titles=[str(year) for year in range(start_year, end_year + 1)],
-            specs=[[{'type': 'pie'}] * len(range(start_year, end_year + 1))]
-        )
-
-        for i, year in enumerate(range(start_year, end_year + 1)):
-            year_df = selected_year_df[selected_year_df["Year"] == str(year)]
-            fig.add_trace(
-                px.pie(
-                    year_df,
-                    names="Debt Indicators",
-                    values="Value",
-                    title=f"Debt by currency in {year}"
-                ).data[0],
-                row=1, col=i+1
-            )
-
-        fig.update_layout(
-            title_text=f"Total debt by currency (percent of total) for {start_year}-{end_year}"
-        )
-
-    elif selected_indicator == "Distribution by maturity type (percent of total)":
-        sliced_df = df_selected[df_selected["Debt Indicators"].isin([
-            "Short-term debt, <1 year (type 2)",
-            "Medium-term debt, 1 year to 5 years (type 2)",
-            "Long-term debt, >5 years (type 2)"
-        ])]
-        melted_df = sliced_df.melt(id_vars=["Debt Indicators"], var_name="Year", value_name="Value")
-        selected_year_df = melted_df[(melted_df["Year"] >= str(start_year)) & (melted_df["Year"] <= str(end_year))]
-        selected_year_df["Value"] = pd.to_numeric(selected_year_df["Value"].str.replace(',', ''), errors='coerce')
-        selected_year_df = selected_year_df.dropna(subset=["Value"])
-
-        fig = make_subplots(
-            rows=1,
-            cols=len(range(start_year, end_year + 1)),
-            subplot_titles=[str(year) for year in range(start_year, end_year + 1)],
-            specs=[[{'type': 'pie'}] * len(range(start_year, end_year + 1))]
-        )
-
-        for i, year in enumerate(range(start_year, end_year + 1)):
-            year_df = selected_year_df[selected_year_df["Year"] == str(year)]
-            fig.add_trace(
-                px.pie(
-                    year_df,
-                    names="Debt Indicators",
-                    values="Value",
-                    title=f"Distribution by maturity type (percent of total) for {year}"
-                ).data[0],
-                row=1, col=i+1
-            )
-
-        fig.update_layout(
-            title_text=f"Distribution by maturity type (percent of total) for {start_year}-{end_year}",
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=-0.2,
-                xanchor="center",
-                x=0.5
-            )
-        )
-
+        fiscal_meta = no_update
+    if triggered != fiscal_dropdown:
+        debt_fig, debt_meta = page_chart(snapshot, "debt", update_debt, selected_range, debt_indicator, debt_meta,
+                                         columns, axis, patch)
     else:
-        melted_df = df_selected.melt(id_vars=["Debt Indicators"], var_name="Year", value_name="Value")
-        selected_year_df = melted_df[(melted_df["Year"] >= str(start_year)) & (melted_df["Year"] <= str(end_year))]
-        selected_year_df["Value"] = pd.to_numeric(selected_year_df["Value"].str.replace('[^\d.-]', '', regex=True), errors='coerce')
-        selected_year_df = selected_year_df.dropna(subset=["Value"])
-        selected_year_df = selected_year_df.sort_values(by="Year")
-        fig = px.line(
-            selected_year_df[selected_year_df["Debt Indicators"] == selected_indicator],
-            x="Year",
-            y="Value",
-            title=f'{selected_indicator} over Time',
-            markers=True
-        )
-        fig.update_yaxes(rangemode='normal')
+        debt_meta = no_update
+    return fiscal_fig, debt_fig, fiscal_meta, debt_meta
+
+
+main_chart_outputs = [Output('fiscal-chart', 'figure'),
+                      Output('debt-chart', 'figure')]
+main_chart_inputs = [Input('year-slider', 'value'),
+                     Input('fiscal-indicator-dropdown', 'value'),
+                     Input('debt-indicator-dropdown', 'value')]
+# What the browser's figures were built from, to check a range patch applies to them
+main_chart_meta = [Output('fiscal-chart-meta', 'data'),
+                   Output('debt-chart-meta', 'data')]
+main_chart_state = [State('fiscal-chart-meta', 'data'),
+                    State('debt-chart-meta', 'data')]
+chart_outputs_2024 = [Output('fiscal-chart-2024', 'figure'),
+                      Output('debt-chart-2024', 'figure')]
+chart_inputs_2024 = [Input('period-slider-2024', 'value'),
+                     Input('fiscal-indicator-dropdown-2024', 'value'),
+                     Input('debt-indicator-dropdown-2024', 'value')]
+chart_meta_2024 = [Output('fiscal-chart-2024-meta', 'data'),
+                   Output('debt-chart-2024-meta', 'data')]
+chart_state_2024 = [State('fiscal-chart-2024-meta', 'data'),
+                    State('debt-chart-2024-meta', 'data')]
+
+
+# Update both charts of the 2006-2023 page from the shared year slider
+@metrics.timed_callback
+def update_main_charts(selected_years, fiscal_indicator, debt_indicator, fiscal_meta, debt_meta):
+    return update_page_charts(selected_years, fiscal_indicator, debt_indicator, fiscal_meta, debt_meta,
+                              'fiscal-indicator-dropdown', 'debt-indicator-dropdown',
+                              update_fiscal_chart, update_debt_chart, annual_columns, ANNUAL_AXIS)
+
+# 2024 callback for both charts
+@metrics.timed_callback
+def update_charts_2024(selected_period, fiscal_indicator, debt_indicator, fiscal_meta, debt_meta):
+    return update_page_charts(selected_period, fiscal_indicator, debt_indicator, fiscal_meta, debt_meta,
+                              'fiscal-indicator-dropdown-2024', 'debt-indicator-dropdown-2024',
+                              update_fiscal_chart_2024, update_debt_chart_2024, columns_2024, MONTHLY_AXIS)
+
+
+if config.CLIENTSIDE_CHARTS:
+    # Draw the charts in the browser (assets/charts.js) from the 'chart-data' store
+    @callback([Output('chart-data', 'data'),
+               Output('chart-data-hash', 'data')],
+              [Input('chart-data-version', 'data')],
+              [State('chart-data-hash', 'data')])
+    @metrics.timed_callback
+    def sync_chart_data(version, stored_version):
+        if version == stored_version:
+            return no_update, no_update
+        payload = chart_payload()
+        return payload, payload["hash"]
+
+    clientside_callback(ClientsideFunction('btr', 'updateMainCharts'), main_chart_outputs,
+                        main_chart_inputs + [Input('chart-data', 'data')], prevent_initial_call=True)
+    clientside_callback(ClientsideFunction('btr', 'updateCharts2024'), chart_outputs_2024,
+                        chart_inputs_2024 + [Input('chart-data', 'data')], prevent_initial_call=True)
+else:
+    callback(main_chart_outputs + main_chart_meta, main_chart_inputs, main_chart_state,
+             prevent_initial_call=True)(update_main_charts)
+    callback(chart_outputs_2024 + chart_meta_2024, chart_inputs_2024, chart_state_2024,
+             prevent_initial_call=True)(update_charts_2024)
+
+def warm_figure_cache():
+    # Build every dropdown indicator for every slider range up front
+    pages = [
+        (main_layout(), 'year-slider', [('fiscal-indicator-dropdown', update_fiscal_chart),
+                                        ('debt-indicator-dropdown', update_debt_chart)]),
+        (layout_2024(), 'period-slider-2024', [('fiscal-indicator-dropdown-2024', update_fiscal_chart_2024),
+                                               ('debt-indicator-dropdown-2024', update_debt_chart_2024)]),
+    ]
+    for layout, slider_id, charts in pages:
+        components = {getattr(c, 'id', None): c for c in layout._traverse()}
+        marks = sorted(components[slider_id].marks)
+        ranges = [[start, end] for i, start in enumerate(marks) for end in marks[i:]]
+        for dropdown_id, update in charts:
+            for option in components[dropdown_id].options:
+                for selected_range in ranges:
+                    update(selected_range, option['value'])
+
+
+def refresh_figure_cache(changed):
+    # Drop figures built from the reloaded files and rebuild the most recently
+    # used of them, so the first users after a release don't all miss at once.
+    # Every worker runs this on its watcher thread, so the rebuild is kept to
+    # FIGURE_CACHE_REFRESH_ENTRIES figures; the rest are built when requested.
+    chart_callbacks = {
+        f.__name__: f
+        for f in (update_fiscal_chart, update_debt_chart, update_fiscal_chart_2024, update_debt_chart_2024)
+    }
+    snapshot = data_source.snapshot()
+    stale = figure_cache.invalidate(lambda key: key[0] in changed and key[1] != figure_version(snapshot, key[0]))
+    if figure_cache.shared is not None:
+        for dataset in changed:
+            figure_cache.shared.discard_stale(dataset, figure_version(snapshot, dataset))
+    # invalidate() lists the keys from least to most recently used
+    recent = stale[-config.FIGURE_CACHE_REFRESH_ENTRIES:] if config.FIGURE_CACHE_REFRESH_ENTRIES else []
+    for dataset, version, name, indicator, selected_range in reversed(recent):
+        chart_callbacks[name](list(selected_range), indicator)
+
+
+def start_background_tasks():
+    # Threads don't survive fork, so servers that fork workers call this in each
+    # worker (see post_fork in gunicorn.conf.py) rather than at import
+    data_source.start_watcher(config.DATA_RELOAD_INTERVAL)
+
+
+class BundleCache:
+    # flask-compress cache for the compressed component bundles. Their URLs are
+    # fingerprinted, so a URL always has the same content; every other response
+    # (callbacks, the page itself) gets an empty key and is compressed each time.
+    # Dash serves a bundle whatever the URL's query string, so the key is the
+    # path alone, and the least recently used bundles go past MAX_ENTRIES.
+    MAX_ENTRIES = 64
+
+    def __init__(self):
+        self.data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self.data.get(key)
+            if value is not None:
+                self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if key.endswith(";"):
+            return
+        with self._lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.MAX_ENTRIES:
+                self.data.popitem(last=False)
+
+
+def bundle_cache_key(request):
+    if request.method == "GET" and "/_dash-component-suites/" in request.path:
+        return request.path
+    return ""
+
+
+def enable_compression(server):
+    # Dash's own compress=True recompresses the bundles on every request, so
+    # configure flask-compress here instead
+    from flask_compress import Compress
+
+    server.config.update(
+        COMPRESS_ALGORITHM=["br", "gzip"],
+        COMPRESS_ALGORITHM_STREAMING=["br", "deflate"],
+        COMPRESS_CACHE_BACKEND=BundleCache,
+        COMPRESS_CACHE_KEY=bundle_cache_key,
+    )
+    Compress(server)
 
-    return fig
 
-# 2024 fiscal callback
-@app.callback(
-    Output('fiscal-chart-2024', 'figure'),
-    [Input('period-slider-2024', 'value'),
-     Input('fiscal-indicator-dropdown-2024', 'value')]
-)
-def update_fiscal_chart_2024(selected_period, selected_indicator):
-    df_selected = df_fiscal
-
-    # Determine the selected months based on the range of the slider
-    period_map = {1: 'Jan-2024', 2: 'Feb-2024', 3: 'Mar-2024', 4: '1Q2024'}
-    selected_months = [period_map[i] for i in range(selected_period[0], selected_period[1] + 1)]
-
-    if selected_indicator == "Revenues":
-        sliced_df = df_selected[df_selected["Fiscal Indicators"].isin([
-            "BIR collections",
-            "BOC collections",
-            "BTr income"
-        ])]
-        melted_df = sliced_df.melt(id_vars=["Fiscal Indicators"], var_name="Month", value_name="Value")
-        selected_month_df = melted_df[melted_df["Month"].isin(selected_months)]
-        selected_month_df = selected_month_df.groupby("Month").apply(lambda x: x.sort_values(by=["Value"], ascending=[False])).reset_index(drop=True)
-        selected_month_df["Month"] = pd.Categorical(selected_month_df["Month"], categories=selected_months, ordered=True)
-        fig = px.bar(
-            selected_month_df.sort_values(by="Month"),
-            x="Month",
-            y="Value",
-            color="Fiscal Indicators",
-            title=f"Revenues for {', '.join(selected_months)}",
-            text_auto=True,
-            barmode='stack'
-        )
-        fig.update_layout(yaxis=dict(type='linear'))
-        
-        return fig
-    elif selected_indicator == "Gross financing":
-        sliced_df = df_selected[df_selected["Fiscal Indicators"].isin([
-            "Domestic financing 1",
-            "External financing 1",
-        ])]
-        melted_df = sliced_df.melt(id_vars=["Fiscal Indicators"], var_name="Month", value_name="Value")
-        selected_month_df = melted_df[melted_df["Month"].isin(selected_months)]
-        selected_month_df = selected_month_df.groupby("Month").apply(lambda x: x.sort_values(by=["Value"], ascending=[False])).reset_index(drop=True)
-        selected_month_df["Month"] = pd.Categorical(selected_month_df["Month"], categories=selected_months, ordered=True)
-        fig = px.bar(
-            selected_month_df.sort_values(by="Month"),
-            x="Month",
-            y="Value",
-            color="Fiscal Indicators",
-            title=f"Gross financing for {', '.join(selected_months)}",
-            text_auto=True,
-            barmode='stack'
-        )
-        fig.update_layout(yaxis=dict(type='linear'))
-
-        return fig
-    elif selected_indicator == "Amortization":
-        sliced_df = df_selected[df_selected["Fiscal Indicators"].isin([
-            "Domestic amortization", "External amortization"
-        ])]
-        melted_df = sliced_df.melt(id_vars=["Fiscal Indicators"], var_name="Month", value_name="Value")
-        selected_month_df = melted_df[melted_df["Month"].isin(selected_months)]
-        selected_month_df = selected_month_df.groupby("Month").apply(lambda x: x.sort_values(by=["Value"], ascending=[False])).reset_index(drop=True)
-        selected_month_df["Month"] = pd.Categorical(selected_month_df["Month"], categories=selected_months, ordered=True)
-        fig = px.bar(
-            selected_month_df.sort_values(by="Month"),
-            x="Month",
-            y="Value",
-            color="Fiscal Indicators",
-            title=f"Amortization for {', '.join(selected_months)}",
-            text_auto=True,
-            barmode='stack'
-        )
-        fig.update_layout(yaxis=dict(type='linear'))
-
-        return fig 
-    elif selected_indicator == "Interest payments":
-        sliced_df = df_selected[df_selected["Fiscal Indicators"].isin([
-            "As share of revenues (percent)",
-            "As share of expenditures (percent)",            
-            "As share of GDP (percent)",
-        ])]
-        melted_df = sliced_df.melt(id_vars=["Fiscal Indicators"], var_name="Month", value_name="Value")
-        selected_month_df = melted_df[melted_df["Month"].isin(selected_months)]
-        selected_month_df["Value"] = pd.to_numeric(selected_month_df["Value"].str.replace(',', ''), errors='coerce')
-        selected_month_df = selected_month_df.dropna(subset=["Value"])
-
-        fig = make_subplots(rows=1, cols=len(selected_months), subplot_titles=selected_months, specs=[[{'type': 'pie'}]*len(selected_months)])
-
-        for i, month in enumerate(selected_months):
-            month_df = selected_month_df[selected_month_df["Month"] == month]
-            fig.add_trace(
-                px.pie(
-                    month_df,
-                    names="Fiscal Indicators",
-                    values="Value",
-                    title=f"Interest payments for {month}"
-                ).data[0],
-                row=1, col=i+1
-            )
-
-        fig.update_layout(title_text=f"Interest payments for {', '.join(selected_months)}")
-        return fig
-
-    elif selected_indicator == "Financing mix (percent distribution of gross borrowing)":
-        sliced_df = df_selected[df_selected["Fiscal Indicators"].isin([
-            "Domestic financing  2",
-            "External financing 2",
-        ])]
-        melted_df = sliced_df.melt(id_vars=["Fiscal Indicators"], var_name="Month", value_name="Value")
-        selected_month_df = melted_df[melted_df["Month"].isin(selected_months)]
-        selected_month_df["Value"] = pd.to_numeric(selected_month_df["Value"].str.replace(',', ''), errors='coerce')
-        selected_month_df = selected_month_df.dropna(subset=["Value"])
-
-        fig = make_subplots(rows=1, cols=len(selected_months), subplot_titles=selected_months, specs=[[{'type': 'pie'}]*len(selected_months)])
-
-        for i, month in enumerate(selected_months):
-            month_df = selected_month_df[selected_month_df["Month"] == month]
-            fig.add_trace(
-                px.pie(
-                    month_df,
-                    names="Fiscal Indicators",
-                    values="Value",
-                    title=f"Financing mix (percent distribution of gross borrowing) for {month}"
-                ).data[0],
-                row=1, col=i+1
-            )
-
-        fig.update_layout(title_text=f"Financing mix (percent distribution of gross borrowing) {', '.join(selected_months)}")
-        return fig
-    else:
-        melted_df = df_selected.melt(id_vars=["Fiscal Indicators"], var_name="Month", value_name="Value")
-        selected_month_df = melted_df[melted_df["Month"].isin(selected_months)]
-        selected_month_df["Value"] = pd.to_numeric(selected_month_df["Value"].str.replace('[^\d.-]', '', regex=True), errors='coerce')
-        selected_month_df = selected_month_df.dropna(subset=["Value"])
-        selected_month_df["Month"] = pd.Categorical(selected_month_df["Month"], categories=selected_months, ordered =True)
-        selected_month_df = selected_month_df.sort_values(by="Month")
-        fig = px.line(
-            selected_month_df[selected_month_df["Fiscal Indicators"] == selected_indicator],
-            x="Month",
-            y="Value",
-            title=f'{selected_indicator} over Time',
-            markers=True
-        )
-        fig.update_yaxes(rangemode='tozero')
+def create_app():
+    # The callbacks above are registered with dash.callback and attach to this app
+    # Dash's own /assets/ links are turned off (assets_ignore) in favour of the hashed URLs
+    stylesheets = [static_assets.url("bootstrap-quartz.min.css"), static_assets.url("custom.css")]
+    scripts = [static_assets.url("charts.js")] if config.CLIENTSIDE_CHARTS else []
+    app = dash.Dash(__name__, external_stylesheets=stylesheets, external_scripts=scripts,
+                    assets_ignore=".*", suppress_callback_exceptions=True)
+    static_assets.init_app(app.server)
+    if config.COMPRESS_RESPONSES:
+        enable_compression(app.server)
+    if config.METRICS:
+        metrics.init_app(app.server, config.METRICS_TOKEN)
+    if config.PROFILE_TOKEN:
+        RequestProfiler(config.PROFILE_TOKEN, config.PROFILE_DIR, config.PROFILE_MODE).init_app(app.server)
+    app.layout = serve_layout
+    return app
 
-        return fig
-    
-# 2024 debt callback
-@app.callback(
-    Output('debt-chart-2024', 'figure'),
-    [Input('period-slider-2024', 'value'),
-     Input('debt-indicator-dropdown-2024', 'value')]
-)
-def update_debt_chart_2024(selected_period, selected_indicator):
-    df_selected = df_debt
-
-    # Determine the selected months based on the range of the slider
-    period_map = {1: 'Jan-2024', 2: 'Feb-2024', 3: 'Mar-2024', 4: '1Q2024'}
-    selected_months = [period_map[i] for i in range(selected_period[0], selected_period[1] + 1)]
-
-    if selected_indicator == "Outstanding debt":
-        sliced_df = df_selected[df_selected["Debt Indicators"].isin([
-            "Domestic debt",
-            "External debt",
-        ])]
-        melted_df = sliced_df.melt(id_vars=["Debt Indicators"], var_name="Month", value_name="Value")
-        selected_month_df = melted_df[melted_df["Month"].isin(selected_months)]
-        selected_month_df = selected_month_df.groupby("Month").apply(lambda x: x.sort_values(by=["Value"], ascending=[False])).reset_index(drop=True)
-        selected_month_df["Month"] = pd.Categorical(selected_month_df["Month"], categories=selected_months, ordered=True)
-        fig = px.bar(
-            selected_month_df.sort_values(by="Month"),
-            x="Month",
-            y="Value",
-            color="Debt Indicators",
-            title=f"Outstanding debt for {', '.join(selected_months)}",
-            text_auto=True,
-            barmode='stack'
-        )
-        fig.update_layout(yaxis=dict(type='linear'))
-        return fig
-
-    elif selected_indicator == "Distribution by maturity type 3/":
-        sliced_df = df_selected[df_selected["Debt Indicators"].isin([
-            "Short-term debt, <1 year (type 1)",
-            "Medium-term debt, 1 year to 5 years (type 1)",
-            "Long-term debt, >5 years (type 1)"
-        ])]
-        melted_df = sliced_df.melt(id_vars=["Debt Indicators"], var_name="Month", value_name="Value")
-        selected_month_df = melted_df[melted_df["Month"].isin(selected_months)]
-        selected_month_df = selected_month_df.groupby("Month").apply(lambda x: x.sort_values(by=["Value"], ascending=[False])).reset_index(drop=True)
-        selected_month_df["Month"] = pd.Categorical(selected_month_df["Month"], categories=selected_months, ordered=True)
-        fig = px.bar(
-            selected_month_df.sort_values(by="Month"),
-            x="Month",
-            y="Value",
-            color="Debt Indicators",
-            title=f"Distribution by maturity type for {', '.join(selected_months)}",
-            text_auto=True,
-            barmode='stack'
-        )
-        fig.update_layout(yaxis=dict(type='linear'))
-        return fig
-
-    elif selected_indicator == "Debt guaranteed by the NG":
-        sliced_df = df_selected[df_selected["Debt Indicators"].isin([
-            "Domestic guarantees",
-            "External guarantees"
-        ])]
-        melted_df = sliced_df.melt(id_vars=["Debt Indicators"], var_name="Month", value_name="Value")
-        selected_month_df = melted_df[melted_df["Month"].isin(selected_months)]
-        selected_month_df = selected_month_df.groupby("Month").apply(lambda x: x.sort_values(by=["Value"], ascending=[False])).reset_index(drop=True)
-        selected_month_df["Month"] = pd.Categorical(selected_month_df["Month"], categories=selected_months, ordered=True)
-        fig = px.bar(
-            selected_month_df.sort_values(by="Month"),
-            x="Month",
-            y="Value",
-            color="Debt Indicators",
-            title=f"Debt guaranteed by the NG for {', '.join(selected_months)}",
-            text_auto=True,
-            barmode='stack'
-        )
-        fig.update_layout(yaxis=dict(type='linear'))
-        return fig
-
-    elif selected_indicator == "Total debt by currency (in billion pesos)":
-        sliced_df = df_selected[df_selected["Debt Indicators"].isin([
-            "Philippine peso (PHP)",
-            "US dollar (USD)",
-            "Japanese yen (JPY)",
-            "Euro (EUR)",
-            "Chinese renminbi (CNY)",
-            "Other currencies 1"
-        ])]
-        melted_df = sliced_df.melt(id_vars=["Debt Indicators"], var_name="Month", value_name="Value")
-        selected_month_df = melted_df[melted_df["Month"].isin(selected_months)]
-        selected_month_df = selected_month_df.groupby("Month").apply(lambda x: x.sort_values(by=["Value"], ascending=[False])).reset_index(drop=True)
-        selected_month_df["Month"] = pd.Categorical(selected_month_df["Month"], categories=selected_months, ordered=True)
-        fig = px.line(
-            selected_month_df.sort_values(by="Month"),
-            x="Month",
-            y="Value",
-            color="Debt Indicators",
-            title=f"Total debt by currency (in billion pesos) for {', '.join(selected_months)}",
-            markers=True
-        )
-        fig.update_layout(yaxis=dict(type='linear'))
-        return fig
-
-    elif selected_indicator == "Total debt by currency (percent of total)":
-        sliced_df = df_selected[df_selected["Debt Indicators"].isin([
-            "PHP",
-            "USD",
-            "JPY",
-            "EUR",
-            "CNY",
-            "Other currencies 2"
-        ])]
-        melted_df = sliced_df.melt(id_vars=["Debt Indicators"], var_name="Month", value_name="Value")
-        selected_month_df = melted_df[melted_df["Month"].isin(selected_months)]
-        selected_month_df["Value"] = pd.to_numeric(selected_month_df["Value"].str.replace(',', ''), errors='coerce')
-        selected_month_df = selected_month_df.dropna(subset=["Value"])
-
-        fig = make_subplots(rows=1, cols=len(selected_months), subplot_titles=selected_months, specs=[[{'type': 'pie'}]*len(selected_months)])
-
-        for i, month in enumerate(selected_months):
-            month_df = selected_month_df[selected_month_df["Month"] == month]
-            fig.add_trace(
-                px.pie(
-                    month_df,
-                    names="Debt Indicators",
-                    values="Value",
-                    title=f"Total debt by currency (percent of total) for {month}"
-                ).data[0],
-                row=1, col=i+1
-            )
-
-        fig.update_layout(title_text=f"Total debt by currency (percent of total) for {', '.join(selected_months)}")
-        return fig
-
-    elif selected_indicator == "Distribution by maturity type (percent of total)":
-        sliced_df = df_selected[df_selected["Debt Indicators"].isin([
-            "Short-term debt, <1 year (type 2)",
-            "Medium-term debt, 1 year to 5 years (type 2)",
-            "Long-term debt, >5 years (type 2)"
-        ])]
-        melted_df = sliced_df.melt(id_vars=["Debt Indicators"], var_name="Month", value_name="Value")
-        selected_month_df = melted_df[melted_df["Month"].isin(selected_months)]
-        selected_month_df["Value"] = pd.to_numeric(selected_month_df["Value"].str.replace(',', ''), errors='coerce')
-        selected_month_df = selected_month_df.dropna(subset=["Value"])
-
-        fig = make_subplots(rows=1, cols=len(selected_months), subplot_titles=selected_months, specs=[[{'type': 'pie'}]*len(selected_months)])
-
-        for i, month in enumerate(selected_months):
-            month_df = selected_month_df[selected_month_df["Month"] == month]
-            fig.add_trace(
-                px.pie(
-                    month_df,
-                    names="Debt Indicators",
-                    values="Value",
-                    title=f"Distribution by maturity type (percent of total) over time"
-                ).data[0],
-                row=1, col=i+1
-            )
-
-        fig.update_layout(
-            title_text=f"Distribution by maturity type (percent of total) for {', '.join(selected_months)}",
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=-0.2,
-                xanchor="center",
-                x=0.5
-            )
-        )
-        return fig
 
-    else:
-        melted_df = df_selected.melt(id_vars=["Debt Indicators"], var_name="Month", value_name="Value")
-        selected_month_df = melted_df[melted_df["Month"].isin(selected_months)]
-        selected_month_df["Value"] = pd.to_numeric(selected_month_df["Value"].str.replace('[^\d.-]', '', regex=True), errors='coerce')
-        selected_month_df = selected_month_df.dropna(subset=["Value"])
-        selected_month_df["Month"] = pd.Categorical(selected_month_df["Month"], categories=selected_months, ordered=True)
-        selected_month_df = selected_month_df.sort_values(by="Month")
-        fig = px.line(
-            selected_month_df[selected_month_df["Debt Indicators"] == selected_indicator],
-            x="Month",
-            y="Value",
-            title=f'{selected_indicator} over Time',
-            markers=True
-        )
-        fig.update_yaxes(rangemode='tozero')
-        return fig
+data_source.on_reload(refresh_figure_cache)
+
+if config.WARM_FIGURE_CACHE:
+    warm_figure_cache()
 
+app = create_app()
+# WSGI entry point: gunicorn -c gunicorn.conf.py apps:server
+server = app.server
 
 # Run the app on port 8051 instead of the default 8050
 if __name__ == '__main__':
+    start_background_tasks()
     app.run_server(debug=True, port=8051)
 
 
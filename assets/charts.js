@@ -0,0 +1,192 @@
+/*
+ * Clientside chart rendering (BTR_CLIENTSIDE_CHARTS=1).
+ *
+ * The server sends the parsed value matrices and the chart specs once, into
+ * the 'chart-data' store (see client_payload in charts.py); these functions
+ * redraw the charts from it when the slider or a dropdown changes, without a
+ * request to the server. They mirror render_chart in charts.py.
+ */
+(function() {
+    function noUpdate() {
+        return window.dash_clientside.no_update;
+    }
+
+    function isObject(value) {
+        return value && typeof value === 'object' && !Array.isArray(value);
+    }
+
+    function merge(target, source) {
+        Object.keys(source || {}).forEach(function(key) {
+            if (isObject(source[key]) && isObject(target[key])) {
+                merge(target[key], source[key]);
+            } else {
+                target[key] = source[key];
+            }
+        });
+        return target;
+    }
+
+    function annualColumns(dataset, startYear, endYear) {
+        var columns = [];
+        dataset.kinds.forEach(function(kind, i) {
+            if (kind === 0 && dataset.years[i] >= startYear && dataset.years[i] <= endYear) {
+                columns.push(i);
+            }
+        });
+        return columns;
+    }
+
+    function subannualColumns(dataset, year, first, last) {
+        // Slider positions count the months and quarters of the year (1-based)
+        var columns = [];
+        dataset.kinds.forEach(function(kind, i) {
+            if (kind !== 0 && dataset.years[i] === year) {
+                columns.push(i);
+            }
+        });
+        return columns.slice(first - 1, last);
+    }
+
+    function gridDomains(count) {
+        var spacing = 0.2 / count;
+        var width = (1 - spacing * (count - 1)) / count;
+        var domains = [];
+        for (var i = 0; i < count; i++) {
+            domains.push([i * (width + spacing), i * (width + spacing) + width]);
+        }
+        return domains;
+    }
+
+    function pieGrid(dataset, chart, columns, title) {
+        var value = chart.units ? '%{value} ' + chart.units : '%{value}';
+        var hovertemplate = dataset.labelName + '=%{label}<br>Value=' + value + '<extra></extra>';
+        var data = [];
+        var annotations = [];
+        gridDomains(columns.length).forEach(function(domain, i) {
+            var labels = [];
+            var values = [];
+            chart.rows.forEach(function(row) {
+                var v = dataset.values[row][columns[i]];
+                if (v !== null) {
+                    labels.push(dataset.labels[row]);
+                    values.push(v);
+                }
+            });
+            data.push({
+                type: 'pie', labels: labels, values: values, domain: {x: domain, y: [0, 1]},
+                hovertemplate: hovertemplate, legendgroup: '', name: '', showlegend: true
+            });
+            annotations.push({
+                text: dataset.periods[columns[i]], x: (domain[0] + domain[1]) / 2, y: 1.0,
+                xref: 'paper', yref: 'paper', xanchor: 'center', yanchor: 'bottom',
+                showarrow: false, font: {size: 16}
+            });
+        });
+        return {data: data, layout: {title: {text: title}, annotations: annotations}};
+    }
+
+    function seriesChart(dataset, chart, columns, title, axisName) {
+        var data = chart.rows.map(function(row) {
+            var label = dataset.labels[row];
+            var x = [];
+            var y = [];
+            columns.forEach(function(column) {
+                var v = dataset.values[row][column];
+                if (v !== null) {
+                    x.push(dataset.periods[column]);
+                    y.push(v);
+                }
+            });
+            var hover = axisName + '=%{x}<br>Value=%{y}<extra></extra>';
+            var trace = {x: x, y: y, name: '', legendgroup: '', showlegend: chart.legend, hovertemplate: hover};
+            if (chart.legend) {
+                trace.name = label;
+                trace.legendgroup = label;
+                trace.hovertemplate = dataset.labelName + '=' + label + '<br>' + hover;
+            }
+            if (chart.kind === 'bar') {
+                trace.type = 'bar';
+                trace.texttemplate = '%{y}';
+                trace.textposition = 'auto';
+            } else {
+                trace.type = 'scatter';
+                trace.mode = 'lines+markers';
+            }
+            return trace;
+        });
+        var layout = {
+            title: {text: title},
+            xaxis: {title: {text: axisName}},
+            yaxis: {title: {text: chart.units || 'Value'}},
+            legend: {tracegroupgap: 0}
+        };
+        if (chart.legend) {
+            layout.legend.title = {text: dataset.labelName};
+        }
+        if (chart.kind === 'bar') {
+            layout.barmode = 'stack';
+        } else if (chart.rows.length > 1) {
+            layout.yaxis.rangemode = 'tozero';
+        }
+        return {data: data, layout: layout};
+    }
+
+    function renderChart(payload, name, indicator, columns, axisName, periodTitle) {
+        var dataset = payload[name];
+        var chart = dataset.charts[indicator];
+        if (!chart) {
+            return noUpdate();
+        }
+        var periods = columns.map(function(column) { return dataset.periods[column]; });
+        var title = chart.title.replace('{indicator}', indicator).replace('{periods}', periodTitle(periods));
+        var figure = chart.kind === 'pie'
+            ? pieGrid(dataset, chart, columns, title)
+            : seriesChart(dataset, chart, columns, title, axisName);
+        figure.layout.template = payload.template;
+        merge(figure.layout, chart.layout);
+        return figure;
+    }
+
+    function updatePage(payload, fiscalIndicator, debtIndicator, fiscalDropdown, debtDropdown, columns, axisName, periodTitle) {
+        if (!payload) {
+            return [noUpdate(), noUpdate()];
+        }
+        var triggered = (window.dash_clientside.callback_context.triggered || []).map(function(t) {
+            return t.prop_id.split('.')[0];
+        });
+        var only = triggered.length === 1 ? triggered[0] : null;
+        return [
+            only === debtDropdown ? noUpdate()
+                : renderChart(payload, 'fiscal', fiscalIndicator, columns(payload.fiscal), axisName, periodTitle),
+            only === fiscalDropdown ? noUpdate()
+                : renderChart(payload, 'debt', debtIndicator, columns(payload.debt), axisName, periodTitle)
+        ];
+    }
+
+    function yearRange(periods) {
+        return periods.length ? periods[0] + '-' + periods[periods.length - 1] : '';
+    }
+
+    function periodList(periods) {
+        return periods.join(', ');
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        btr: {
+            updateMainCharts: function(selectedYears, fiscalIndicator, debtIndicator, payload) {
+                return updatePage(payload, fiscalIndicator, debtIndicator,
+                    'fiscal-indicator-dropdown', 'debt-indicator-dropdown',
+                    function(dataset) { return annualColumns(dataset, selectedYears[0], selectedYears[1]); },
+                    'Year', yearRange);
+            },
+            updateCharts2024: function(selectedPeriod, fiscalIndicator, debtIndicator, payload) {
+                return updatePage(payload, fiscalIndicator, debtIndicator,
+                    'fiscal-indicator-dropdown-2024', 'debt-indicator-dropdown-2024',
+                    function(dataset) {
+                        return subannualColumns(dataset, payload.pageYear2024, selectedPeriod[0], selectedPeriod[1]);
+                    },
+                    'Month', periodList);
+            }
+        }
+    });
+})();
@@ -0,0 +1,185 @@
+"""Latency benchmark of the chart callbacks.
+
+    python benchmark.py --output bench.json
+    python benchmark.py --baseline bench.json
+
+builds every dropdown indicator of both pages for a representative set of
+slider ranges with an empty figure cache, i.e. what a cache miss costs, and
+reports per callback the p50/p95/p99 latency, the peak memory allocated by
+one build (tracemalloc) and the size of the serialized figure. With
+--baseline, the results are compared with an earlier run and the exit
+status is 1 if a callback got slower or its figures larger than the
+tolerance allows, so a slower branch can be caught before a deploy.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# Measure the builds themselves: no shared cache, pool or warm-up
+os.environ["BTR_FIGURE_CACHE_DIR"] = ""
+os.environ["BTR_FIGURE_POOL_WORKERS"] = "0"
+os.environ["BTR_WARM_FIGURE_CACHE"] = "0"
+
+import plotly.io as pio
+
+import apps
+
+PERCENTILES = (50, 95, 99)
+# Compared with the baseline; p99 of a few hundred builds is mostly garbage
+# collection noise, so it is reported but not checked
+CHECKED = ("p50_ms", "p95_ms", "size_bytes_max")
+
+
+def representative_ranges(marks):
+    # Whole range, its first and last mark alone, and both halves
+    first, last = marks[0], marks[-1]
+    middle = marks[len(marks) // 2]
+    ranges = [[first, last], [first, first], [last, last], [first, middle], [middle, last]]
+    return [list(r) for r in dict.fromkeys(tuple(r) for r in ranges)]
+
+
+def cases():
+    # (callback, indicator, slider range) for every dropdown option of both pages
+    pages = [
+        (apps.main_layout(), 'year-slider', [('fiscal-indicator-dropdown', apps.update_fiscal_chart),
+                                             ('debt-indicator-dropdown', apps.update_debt_chart)]),
+        (apps.layout_2024(), 'period-slider-2024', [('fiscal-indicator-dropdown-2024', apps.update_fiscal_chart_2024),
+                                                    ('debt-indicator-dropdown-2024', apps.update_debt_chart_2024)]),
+    ]
+    for layout, slider_id, charts in pages:
+        components = {getattr(c, 'id', None): c for c in layout._traverse()}
+        ranges = representative_ranges(sorted(components[slider_id].marks))
+        for dropdown_id, update in charts:
+            for option in components[dropdown_id].options:
+                for selected_range in ranges:
+                    yield update, option['value'], selected_range
+
+
+def measure(update, indicator, selected_range, repeat):
+    # Seconds per build, peak bytes allocated by one build, serialized size
+    seconds = []
+    gc.collect()
+    for _ in range(repeat):
+        apps.figure_cache.clear()
+        start = time.perf_counter()
+        fig = update(selected_range, indicator)
+        seconds.append(time.perf_counter() - start)
+    apps.figure_cache.clear()
+    tracemalloc.start()
+    update(selected_range, indicator)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak, len(pio.to_json(fig, validate=False))
+
+
+def summarize(seconds, peaks, sizes):
+    ms = np.array(seconds) * 1000
+    summary = {f"p{p}_ms": round(float(np.percentile(ms, p)), 3) for p in PERCENTILES}
+    summary.update({
+        "max_ms": round(float(ms.max()), 3),
+        "builds": len(ms),
+        "peak_alloc_kb_mean": round(float(np.mean(peaks)) / 1024, 1),
+        "peak_alloc_kb_max": round(float(np.max(peaks)) / 1024, 1),
+        "size_bytes_mean": round(float(np.mean(sizes))),
+        "size_bytes_max": int(np.max(sizes)),
+    })
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(repeat):
+    results = {}
+    slowest = []
+    for update, indicator, selected_range in cases():
+        seconds, peak, size = measure(update, indicator, selected_range, repeat)
+        result = results.setdefault(update.__name__, {"seconds": [], "peaks": [], "sizes": []})
+        result["seconds"] += seconds
+        result["peaks"].append(peak)
+        result["sizes"].append(size)
+        slowest.append((float(np.median(seconds)) * 1000, update.__name__, indicator, selected_range))
+    slowest.sort(reverse=True)
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": repeat,
+        },
+        "callbacks": {name: summarize(r["seconds"], r["peaks"], r["sizes"]) for name, r in results.items()},
+        "slowest": [{"callback": name, "indicator": indicator, "range": selected_range, "median_ms": round(ms, 3)}
+                    for ms, name, indicator, selected_range in slowest[:10]],
+    }
+
+
+def compare(current, baseline, tolerance):
+    # Regressions of the CHECKED metrics, as messages
+    regressions = []
+    for name, now in current["callbacks"].items():
+        before = baseline["callbacks"].get(name)
+        if before is None:
+            continue
+        for metric in CHECKED:
+            if before[metric] and now[metric] > before[metric] * (1 + tolerance):
+                regressions.append(f"{name} {metric}: {before[metric]} -> {now[metric]} "
+                                   f"(+{(now[metric] / before[metric] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def report(results, baseline=None):
+    print(f"{'callback':26} {'builds':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'alloc KB':>9} {'max size':>9}")
+    for name, s in results["callbacks"].items():
+        line = (f"{name:26} {s['builds']:6} {s['p50_ms']:8.2f} {s['p95_ms']:8.2f} {s['p99_ms']:8.2f} "
+                f"{s['peak_alloc_kb_max']:9.0f} {s['size_bytes_max']:9}")
+        before = (baseline or {}).get("callbacks", {}).get(name)
+        if before:
+            line += f"   p95 {(s['p95_ms'] / before['p95_ms'] - 1) * 100:+.0f}% vs baseline"
+        print(line)
+    print("slowest:")
+    for case in results["slowest"][:5]:
+        print(f"  {case['median_ms']:8.2f} ms  {case['callback']} {case['indicator']!r} {case['range']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="builds per case (default 5)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown/growth over the baseline (default 0.25, i.e. 25%%)")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for message in regressions:
+            print("REGRESSION", message)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Which chart each dropdown indicator gets.
+
+Every indicator picked from a dropdown maps to a ChartSpec: the series it
+plots, the chart kind, its units and its layout tweaks. Indicators without
+an entry are drawn as a single line of their own row. All specs go through
+charts.render_chart, for both the annual and the 2024 pages.
+"""
+from dataclasses import dataclass, field
+
+BAR = "bar"
+LINE = "line"
+PIE = "pie"
+
+
+@dataclass(frozen=True)
+class ChartSpec:
+    dataset: str
+    indicator: str
+    kind: str
+    # (section, indicator) keys of the plotted rows; a str names a section
+    # whose direct children are plotted, None plots the indicator's own row
+    series: object
+    units: str = None
+    title: str = "{indicator} for {periods}"
+    layout: dict = field(default_factory=dict, hash=False, compare=False)
+
+    def rows(self, store):
+        if self.series is None:
+            try:
+                return [store.find(self.indicator)]
+            except KeyError:
+                # Not one row of this store (a cleared dropdown sends None): an
+                # empty chart, not a failed callback
+                return []
+        if isinstance(self.series, str):
+            return store.children(self.series)
+        return store.rows(self.series)
+
+
+@dataclass(frozen=True)
+class PeriodAxis:
+    # How a page names and titles its slice of the period columns
+    name: str
+    separator: str
+
+    def title(self, labels):
+        if self.separator == "-":
+            return f"{labels[0]}-{labels[-1]}" if len(labels) else ""
+        return self.separator.join(labels)
+
+
+ANNUAL_AXIS = PeriodAxis("Year", "-")        # "2006-2023"
+MONTHLY_AXIS = PeriodAxis("Month", ", ")    # "Jan-2024, Feb-2024"
+
+_STACKED_LEGEND = {"legend": dict(font=dict(size=10), title_font=dict(size=5))}
+_BOTTOM_LEGEND = {"legend": dict(orientation="h", yanchor="bottom", y=-0.2, xanchor="center", x=0.5)}
+
+SPECS = [
+    # Fiscal indicators
+    ChartSpec("fiscal", "Revenues", BAR, (
+        ("Tax revenues", "BIR collections"),
+        ("Tax revenues", "BOC collections"),
+        ("Non-tax revenues, including grants", "BTr income"),
+    )),
+    ChartSpec("fiscal", "Gross financing", BAR, "Gross financing"),
+    ChartSpec("fiscal", "Amortization", BAR, (
+        ("Amortization", "Domestic amortization"),
+        ("Amortization", "External amortization"),
+    )),
+    ChartSpec("fiscal", "Interest payments", PIE, "Interest payments", units="percent"),
+    ChartSpec("fiscal", "Financing mix (percent distribution of gross borrowing)", PIE,
+              "Financing mix (percent distribution of gross borrowing)", units="percent"),
+
+    # Debt indicators
+    ChartSpec("debt", "Outstanding debt", BAR, "Outstanding debt"),
+    ChartSpec("debt", "Distribution by maturity type 3/", BAR, "Distribution by maturity type 3/",
+              layout=_STACKED_LEGEND),
+    ChartSpec("debt", "Debt guaranteed by the NG", BAR, "Debt guaranteed by the NG"),
+    ChartSpec("debt", "Total debt by currency (in billion pesos)", LINE,
+              "Total debt by currency (in billion pesos)", units="billion pesos"),
+    ChartSpec("debt", "Total debt by currency (percent of total)", PIE,
+              "Total debt by currency (percent of total)", units="percent"),
+    ChartSpec("debt", "Distribution by maturity type (percent of total)", PIE,
+              "Distribution by maturity type (percent of total)", units="percent", layout=_BOTTOM_LEGEND),
+]
+
+REGISTRY = {(spec.dataset, spec.indicator): spec for spec in SPECS}
+
+# Rows that are never offered in the dropdowns besides the series above
+HIDDEN_ROWS = {
+    "fiscal": {"Domestic financing 3", "External financing 3"},
+    "debt": {"On domestic debt", "On external debt", "Debt Indicators (continued)", "Memo items:"},
+}
+
+# y axis range of the single-indicator line charts
+LINE_RANGEMODE = {"fiscal": "tozero", "debt": "normal"}
+
+
+def chart_spec(dataset, indicator):
+    spec = REGISTRY.get((dataset, indicator))
+    if spec is None:
+        spec = ChartSpec(dataset, indicator, LINE, None, title="{indicator} over Time",
+                         layout={"yaxis": {"rangemode": LINE_RANGEMODE[dataset]}})
+    return spec
+
+
+def indicator_options(store, dataset):
+    # Dropdown options: every row except the series drawn inside another chart
+    hidden = set(HIDDEN_ROWS.get(dataset, ()))
+    for spec in SPECS:
+        if spec.dataset == dataset:
+            hidden.update(store.labels[spec.rows(store)])
+    options = []
+    for label in dict.fromkeys(store.labels):
+        if label not in hidden:
+            options.append({'label': label, 'value': label})
+    return options
@@ -0,0 +1,215 @@
+"""Figure builders shared by the chart callbacks."""
+import base64
+import hashlib
+import json
+
+import numpy as np
+import plotly
+import plotly.graph_objects as go
+import plotly.io as pio
+from dash import Patch
+
+import chart_specs
+from chart_specs import BAR, PIE, chart_spec, indicator_options
+from metrics import phase
+
+
+def render_version():
+    # Hash of the code that draws the figures and of the plotly version, so
+    # cached figures drawn by an earlier release are not served by this one
+    digest = hashlib.sha256(plotly.__version__.encode())
+    for path in (__file__, chart_specs.__file__):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:8]
+
+
+RENDER_VERSION = render_version()
+
+
+def grid_domains(count, spacing=None):
+    # Horizontal subplot domains, laid out the same way as make_subplots(rows=1, cols=count)
+    if spacing is None:
+        spacing = 0.2 / count
+    width = (1 - spacing * (count - 1)) / count
+    return [[i * (width + spacing), i * (width + spacing) + width] for i in range(count)]
+
+
+def typed_array(values):
+    # plotly.js typed array spec ({"dtype", "bdata"}) in the smallest dtype that
+    # holds every value exactly: whole numbers as 1-4 byte ints, else float32.
+    # Values that need float64 stay a JSON list, which is shorter than their base64.
+    values = np.asarray(values, dtype=np.float64)
+    dtype = None
+    if values.size and np.array_equal(values, np.round(values)):
+        for candidate in ("<i1", "<i2", "<i4"):
+            info = np.iinfo(candidate)
+            if info.min <= values.min() and values.max() <= info.max:
+                dtype = candidate
+                break
+    if dtype is None and values.size and np.array_equal(values.astype("<f4"), values):
+        dtype = "<f4"
+    if dtype is None:
+        return values.tolist()
+    data = values.astype(dtype).tobytes()
+    return {"dtype": dtype[1:], "bdata": base64.b64encode(data).decode("ascii")}
+
+
+def pack_figure(fig):
+    # Figure dict with the numeric trace data as typed arrays
+    figure = fig.to_plotly_json()
+    for trace in figure["data"]:
+        for name in ("y", "values"):
+            if name in trace:
+                trace[name] = typed_array(trace[name])
+    return figure
+
+
+def pie_grid(store, rows, columns, title, units=None):
+    # One pie per period, side by side, built straight from the value matrix
+    labels = store.labels[rows]
+    titles = store.periods[columns]
+    block = store.block(rows, columns)
+    present = ~np.isnan(block)
+    value = f"%{{value}} {units}" if units else "%{value}"
+    hovertemplate = f"{store.label_name}=%{{label}}<br>Value={value}<extra></extra>"
+
+    traces = []
+    annotations = []
+    for i, domain in enumerate(grid_domains(block.shape[1])):
+        keep = present[:, i]
+        traces.append(go.Pie(
+            labels=labels[keep],
+            values=block[keep, i],
+            domain={"x": domain, "y": [0.0, 1.0]},
+            hovertemplate=hovertemplate,
+            legendgroup="",
+            name="",
+            showlegend=True,
+        ))
+        annotations.append({
+            "text": titles[i], "x": (domain[0] + domain[1]) / 2, "y": 1.0,
+            "xref": "paper", "yref": "paper", "xanchor": "center", "yanchor": "bottom",
+            "showarrow": False, "font": {"size": 16},
+        })
+
+    return go.Figure(data=traces, layout={"title": {"text": title}, "annotations": annotations})
+
+
+def series_rows(store, spec):
+    rows = spec.rows(store)
+    if spec.kind == BAR:
+        # Stack the largest series at the bottom
+        totals = np.nansum(store.values[rows], axis=1)
+        rows = [rows[i] for i in np.argsort(-totals, kind="stable")]
+    return rows
+
+
+def prepare_tables(dataset, store):
+    # Materialize the long table of every bar and line chart in the dropdowns
+    for option in indicator_options(store, dataset):
+        spec = chart_spec(dataset, option['value'])
+        if spec.kind != PIE:
+            store.long_table(series_rows(store, spec))
+
+
+def chart_title(store, spec, columns, axis):
+    return spec.title.format(indicator=spec.indicator, periods=axis.title(list(store.periods[columns])))
+
+
+def chart_meta(dataset, indicator, version):
+    # Stamped into layout.meta of every figure, so the figure in the browser
+    # says which chart and data version it was built from (see patch_chart)
+    return {"dataset": dataset, "indicator": indicator, "version": version, "render": RENDER_VERSION}
+
+
+def render_chart(store, spec, columns, axis, meta=None):
+    # The one render path behind every chart callback
+    with phase("slice"):
+        rows = series_rows(store, spec)
+        title = chart_title(store, spec, columns, axis)
+        if spec.kind != PIE:
+            table = store.long_table(rows)
+            series = table.series_data(columns)
+
+    with phase("figure"):
+        if spec.kind == PIE:
+            fig = pie_grid(store, rows, columns, title, spec.units)
+        else:
+            # Traces come from the whole table, so a chart has the same traces (and
+            # colors) for every period range and patch_chart can swap their data.
+            # plotly express (and pandas) load on the first figure, not at startup.
+            import plotly.express as px
+
+            options = dict(x="Period", y="Value", title=title, labels={"Period": axis.name})
+            if spec.kind == BAR:
+                fig = px.bar(table.frame, color=store.label_name, category_orders={store.label_name: table.series},
+                             text_auto=True, barmode='stack', **options)
+            elif len(rows) > 1:
+                fig = px.line(table.frame, color=store.label_name, category_orders={store.label_name: table.series},
+                              markers=True, **options)
+                fig.update_yaxes(rangemode='tozero')
+            else:
+                fig = px.line(table.frame, markers=True, **options)
+            for trace, (x, y) in zip(fig.data, series):
+                trace.update(x=x, y=y)
+            if spec.units:
+                fig.update_yaxes(title_text=spec.units)
+        fig.update_layout(spec.layout, meta=meta)
+
+    with phase("pack"):
+        return pack_figure(fig)
+
+
+def patch_chart(store, spec, columns, axis, meta=None):
+    # Partial update for a chart already drawn for another period range: new
+    # x/y data for its traces and a new title. Only valid for a figure whose
+    # layout.meta is meta, i.e. built from the same data version, which has the
+    # same traces in the same order. Pie grids have one trace per period, so
+    # they return None and are rebuilt instead.
+    if spec.kind == PIE:
+        return None
+    with phase("patch"):
+        table = store.long_table(series_rows(store, spec))
+        patch = Patch()
+        for i, (x, y) in enumerate(table.series_data(columns)):
+            patch['data'][i]['x'] = x.tolist()
+            patch['data'][i]['y'] = typed_array(y)
+        patch['layout']['title']['text'] = chart_title(store, spec, columns, axis)
+        patch['layout']['meta'] = meta
+    return patch
+
+
+def client_dataset(dataset, store):
+    # One store and the specs of its dropdown charts, for the browser renderer in
+    # assets/charts.js. Rows are already in the order render_chart would use.
+    charts = {}
+    for option in indicator_options(store, dataset):
+        spec = chart_spec(dataset, option['value'])
+        rows = series_rows(store, spec)
+        charts[spec.indicator] = {
+            "kind": spec.kind,
+            "rows": [int(row) for row in rows],
+            "title": spec.title,
+            "units": spec.units,
+            "layout": spec.layout,
+            "legend": spec.kind == BAR or len(rows) > 1,
+        }
+    return {
+        "labelName": store.label_name,
+        "labels": list(store.labels),
+        "periods": list(store.periods),
+        "kinds": store.period_index.kinds.tolist(),
+        "years": store.period_index.years.tolist(),
+        "values": [[None if np.isnan(v) else float(v) for v in row] for row in store.values],
+        "charts": charts,
+    }
+
+
+def client_payload(stores, **extra):
+    # Everything the clientside charts need, tagged with a hash of its content
+    payload = {name: client_dataset(name, store) for name, store in stores.items()}
+    payload.update(extra)
+    payload["template"] = pio.templates[pio.templates.default].to_plotly_json()
+    payload["hash"] = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:16]
+    return payload
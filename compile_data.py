@@ -0,0 +1,37 @@
+"""Compile the CSV data files into memory-mapped binary files.
+
+    BTR_COMPILED_DATA_DIR=/var/cache/btr python compile_data.py
+
+parses the fiscal and debt CSV files (see config.py) once and writes their
+compiled copies to BTR_COMPILED_DATA_DIR (see compiled_data.py), so the
+workers started afterwards map them instead of parsing the CSV files. Files
+already compiled from the current CSV files are left alone.
+"""
+import hashlib
+import os
+import sys
+import time
+
+import compiled_data
+import config
+from data_source import read_file
+
+
+def main():
+    if not config.COMPILED_DATA_DIR:
+        sys.exit("Set BTR_COMPILED_DATA_DIR to the compiled data directory")
+    for csv_path in (config.FISCAL_CSV, config.DEBT_CSV):
+        start = time.perf_counter()
+        _, data = read_file(csv_path)
+        sha256 = hashlib.sha256(data).hexdigest()
+        path = compiled_data.compiled_path(csv_path, config.COMPILED_DATA_DIR)
+        if compiled_data.open_compiled(path, sha256) is not None:
+            print(f"{path}: up to date")
+            continue
+        store = compiled_data.load(csv_path, sha256, config.COMPILED_DATA_DIR, data)
+        print(f"{path}: {store.values.shape[0]} indicators x {store.values.shape[1]} periods, "
+              f"{os.path.getsize(path) / 1024:.0f} KB, {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
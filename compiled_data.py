@@ -0,0 +1,100 @@
+"""CSV data files compiled into memory-mapped binary files.
+
+Parsing a CSV file (quoted, comma-grouped numbers) is most of the work of
+starting a process. A compiled file holds the parsed IndicatorStore instead:
+a small JSON header (labels, sorted period labels, the SHA-256 of the CSV
+file it came from) followed by the float64 value matrix, aligned so it can
+be memory-mapped as it is. Every process opening the file reads the same
+page-cache pages instead of a private parsed copy.
+
+A compiled file is only used while its recorded hash matches the CSV file;
+otherwise the CSV file is parsed and the compiled file is rewritten.
+"""
+import io
+import json
+import logging
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from indicator_store import SECTIONS, IndicatorStore
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"BTRDATA1"
+# magic, header length
+PREFIX = struct.Struct("<8sQ")
+# The matrix starts at a multiple of this many bytes
+ALIGN = 64
+
+
+def compiled_path(csv_path, directory):
+    # ng_fiscal_modified.csv -> <directory>/ng_fiscal_modified.btrdata
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(directory, stem + ".btrdata")
+
+
+def write_compiled(store, sha256, path):
+    # Written to a temporary file and renamed, so processes that have the old
+    # file mapped keep reading it and new ones see a complete file
+    header = json.dumps({
+        "sha256": sha256,
+        "label_name": store.label_name,
+        "labels": list(store.labels),
+        "periods": list(store.periods),
+        "shape": list(store.values.shape),
+    }).encode("utf-8")
+    offset = PREFIX.size + len(header)
+    padding = b" " * (-offset % ALIGN)
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(PREFIX.pack(MAGIC, len(header) + len(padding)))
+            f.write(header + padding)
+            f.write(np.ascontiguousarray(store.values, dtype="<f8").tobytes())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def open_compiled(path, sha256=None):
+    # IndicatorStore over a memory map of the file, or None if there is no
+    # file or it was compiled from a different CSV file than sha256
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with f:
+        magic, length = PREFIX.unpack(f.read(PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a compiled data file")
+        header = json.loads(f.read(length))
+    if sha256 is not None and header["sha256"] != sha256:
+        return None
+    values = np.memmap(path, dtype="<f8", mode="r", offset=PREFIX.size + length, shape=tuple(header["shape"]))
+    label_name = header["label_name"]
+    return IndicatorStore(label_name, header["labels"], header["periods"], values, SECTIONS.get(label_name))
+
+
+def load(csv_path, sha256, directory, data=None):
+    # The store of a CSV file from its compiled file, compiling it first if
+    # needed; data is the content of the CSV file, when already read
+    path = compiled_path(csv_path, directory)
+    try:
+        store = open_compiled(path, sha256)
+        if store is not None:
+            return store
+    except (OSError, ValueError):
+        logger.warning("Could not open %s; parsing %s instead", path, csv_path, exc_info=True)
+    store = IndicatorStore.from_csv(io.BytesIO(data) if data is not None else csv_path)
+    try:
+        write_compiled(store, sha256, path)
+    except OSError:
+        logger.warning("Could not write %s", path, exc_info=True)
+    return store
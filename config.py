@@ -0,0 +1,67 @@
+"""Runtime settings for the dashboard, read from environment variables."""
+import os
+import tempfile
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def env_bool(name, default):
+    value = os.environ.get(name)
+    if not value:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Dashboard CSV files; BTR_DATA_DIR defaults to the directory of this file
+DATA_DIR = os.environ.get("BTR_DATA_DIR") or os.path.dirname(os.path.abspath(__file__))
+FISCAL_CSV = os.environ.get("BTR_FISCAL_CSV") or os.path.join(DATA_DIR, "ng_fiscal_modified.csv")
+DEBT_CSV = os.environ.get("BTR_DEBT_CSV") or os.path.join(DATA_DIR, "NG_debt_modified.csv")
+# Seconds between checks for changed CSV files; 0 turns hot reloading off
+DATA_RELOAD_INTERVAL = env_int("BTR_DATA_RELOAD_INTERVAL", 60)
+# Directory of the compiled, memory-mapped copies of the CSV files (see
+# compiled_data.py); unset parses the CSV files in every process
+COMPILED_DATA_DIR = os.environ.get("BTR_COMPILED_DATA_DIR", "")
+
+# In-memory figure cache (see figure_cache.py)
+FIGURE_CACHE_MAX_ENTRIES = env_int("BTR_FIGURE_CACHE_MAX_ENTRIES", 20000)
+FIGURE_CACHE_MAX_BYTES = env_int("BTR_FIGURE_CACHE_MAX_MB", 256) * 1024 * 1024
+# Figure cache shared by all worker processes (see disk_cache.py), in this
+# directory; unset keeps figures in each process's memory only
+FIGURE_CACHE_DIR = os.environ.get("BTR_FIGURE_CACHE_DIR", "")
+FIGURE_CACHE_DISK_MAX_BYTES = env_int("BTR_FIGURE_CACHE_DISK_MB", 1024) * 1024 * 1024
+# Processes that build figures on cache misses, off the request threads
+# (see figure_pool.py); 0 builds them in-process. Builds taking longer than
+# the timeout (seconds) are redone in-process.
+FIGURE_POOL_WORKERS = env_int("BTR_FIGURE_POOL_WORKERS", 0)
+FIGURE_POOL_TIMEOUT = env_int("BTR_FIGURE_POOL_TIMEOUT", 10)
+# Figures rebuilt after a data reload, the most recently used first; the other
+# figures of the reloaded files are built when next requested
+FIGURE_CACHE_REFRESH_ENTRIES = env_int("BTR_FIGURE_CACHE_REFRESH_ENTRIES", 100)
+# Build every dropdown indicator x slider range before serving the first request
+WARM_FIGURE_CACHE = env_bool("BTR_WARM_FIGURE_CACHE", False)
+
+# Negotiated brotli/gzip compression of callback responses and component bundles
+COMPRESS_RESPONSES = env_bool("BTR_COMPRESS", True)
+
+# Callback timings and figure cache counters in Prometheus format on /metrics
+# (see metrics.py; needs prometheus_client)
+METRICS = env_bool("BTR_METRICS", True)
+# Bearer token /metrics requires; unset, it is only served to this machine
+METRICS_TOKEN = os.environ.get("BTR_METRICS_TOKEN", "")
+
+# Profile single callback requests that carry this token (see profiling.py);
+# unset turns profiling off. Profiles are written to BTR_PROFILE_DIR, as
+# "sample" (folded stacks) or "cprofile" (pstats) profiles.
+PROFILE_TOKEN = os.environ.get("BTR_PROFILE_TOKEN", "")
+PROFILE_DIR = os.environ.get("BTR_PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "btr-profiles")
+PROFILE_MODE = os.environ.get("BTR_PROFILE_MODE", "sample")
+
+# Live-ticking components such as the home page clock; 0 shows a static page-load time
+LIVE_COMPONENTS = env_bool("BTR_LIVE_COMPONENTS", True)
+
+# Draw the dashboard charts in the browser (assets/charts.js) from a copy of the
+# data kept in localStorage, instead of a server round trip per slider move
+CLIENTSIDE_CHARTS = env_bool("BTR_CLIENTSIDE_CHARTS", False)
@@ -0,0 +1,175 @@
+"""CSV data files behind the dashboard, with hot reloading.
+
+Each dataset is fingerprinted by (mtime, size, content hash). A background
+thread polls the files and, when one changes, parses it into a new
+IndicatorStore and publishes a new Snapshot of all datasets with a single
+reference swap. Readers take one snapshot per request and read every store
+and version from it without locking, so a reload never tears a chart build
+that is in flight. Listeners are told which datasets changed so they can
+drop only the figures derived from them. A file that doesn't parse into
+one of the dashboard's tables (see IndicatorStore.from_csv) is logged and
+the loaded data stays in place.
+"""
+import hashlib
+import io
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+
+import compiled_data
+from indicator_store import IndicatorStore
+
+logger = logging.getLogger(__name__)
+
+
+def read_file(path):
+    # (mtime, size) and the bytes of a file, from one open file, so the hash
+    # and the parsed store describe the same content even while it is replaced
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        return (st.st_mtime_ns, st.st_size), f.read()
+
+
+def file_stat(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class Dataset:
+    # One loaded CSV file; never modified after construction
+    def __init__(self, name, path, stat, sha256, store):
+        self.name = name
+        self.path = path
+        self.stat = stat
+        self.sha256 = sha256
+        self.store = store
+
+    @classmethod
+    def load(cls, name, path, prepare=None, compiled_dir=None):
+        stat, data = read_file(path)
+        return cls.parse(name, path, stat, data, prepare, compiled_dir)
+
+    @classmethod
+    def parse(cls, name, path, stat, data, prepare=None, compiled_dir=None):
+        # data is the content of the file at path. With compiled_dir, the
+        # values are memory-mapped from a compiled copy of it (see
+        # compiled_data.py) instead of parsed from the CSV.
+        sha256 = hashlib.sha256(data).hexdigest()
+        if compiled_dir:
+            store = compiled_data.load(path, sha256, compiled_dir, data)
+        else:
+            store = IndicatorStore.from_csv(io.BytesIO(data))
+        if prepare is not None:
+            prepare(name, store)
+        return cls(name, path, stat, sha256, store)
+
+    @property
+    def version(self):
+        return self.sha256[:16]
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    # The datasets being served at one moment; replaced, never modified
+    datasets: MappingProxyType
+
+    def store(self, name):
+        return self.datasets[name].store
+
+    def version(self, name):
+        return self.datasets[name].version
+
+    def replace(self, datasets):
+        # A new snapshot with these datasets in place of the ones of the same name
+        return Snapshot(MappingProxyType(dict(self.datasets, **{dataset.name: dataset for dataset in datasets})))
+
+
+class DataSource:
+    def __init__(self, paths, prepare=None, compiled_dir=None):
+        # prepare(name, store) derives per-store tables before a store is published
+        self.paths = dict(paths)
+        self.prepare = prepare
+        self.compiled_dir = compiled_dir
+        self._snapshot = Snapshot(MappingProxyType(
+            {name: Dataset.load(name, path, prepare, compiled_dir) for name, path in self.paths.items()}))
+        self._listeners = []
+        self._rejected = {}  # name -> (mtime, size) of a file that failed to load
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+
+    def snapshot(self):
+        return self._snapshot
+
+    # Shortcuts for a single read; use one snapshot() for several related reads
+    def store(self, name):
+        return self._snapshot.store(name)
+
+    def version(self, name):
+        return self._snapshot.version(name)
+
+    def on_reload(self, listener):
+        # listener(changed_names) runs on the reloading thread after the swap
+        self._listeners.append(listener)
+
+    def check(self):
+        # Reload every dataset whose file changed; returns the changed names
+        with self._reload_lock:
+            changed = []
+            reloaded = []
+            for name, path in self.paths.items():
+                current = self._snapshot.datasets[name]
+                stat = None
+                try:
+                    stat = file_stat(path)
+                    if stat == current.stat or stat == self._rejected.get(name):
+                        continue
+                    stat, data = read_file(path)
+                    if hashlib.sha256(data).hexdigest() == current.sha256:
+                        # Touched but not modified: keep the parsed store and derived figures
+                        dataset = Dataset(name, path, stat, current.sha256, current.store)
+                    else:
+                        dataset = Dataset.parse(name, path, stat, data, self.prepare, self.compiled_dir)
+                        if dataset.store.label_name != current.store.label_name:
+                            raise ValueError(f"{name}: label column {dataset.store.label_name!r}, "
+                                             f"expected {current.store.label_name!r}")
+                        changed.append(name)
+                except Exception:
+                    # A malformed or half-written file: serve the current data
+                    # and try again once the file changes
+                    logger.exception("Could not reload %s from %s; keeping the loaded data", name, path)
+                    self._rejected[name] = stat
+                    continue
+                reloaded.append(dataset)
+            if reloaded:
+                # One reference swap for all of them: readers hold either the
+                # old or the new snapshot, never one with only some files reloaded
+                self._snapshot = self._snapshot.replace(reloaded)
+            if not changed:
+                return []
+            logger.info("Reloaded data: %s", ", ".join(changed))
+        for listener in self._listeners:
+            listener(changed)
+        return changed
+
+    def start_watcher(self, interval):
+        if self._watcher is not None or interval <= 0:
+            return
+        stop = threading.Event()
+
+        def poll():
+            while not stop.wait(interval):
+                try:
+                    self.check()
+                except Exception:
+                    logger.exception("Data reload failed")
+
+        self._watcher = threading.Thread(target=poll, name="data-source-watcher", daemon=True)
+        self._watcher.stop = stop
+        self._watcher.start()
+
+    def stop_watcher(self):
+        if self._watcher is not None:
+            self._watcher.stop.set()
+            self._watcher = None
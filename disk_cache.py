@@ -0,0 +1,115 @@
+"""Figure cache shared by the worker processes, in a SQLite file.
+
+Each gunicorn worker keeps its own in-memory FigureCache; this store sits
+behind it, so a figure built by one worker (or by prewarm.py before the
+workers start) is read by the others instead of being rebuilt. Keys carry
+the figure version (the dataset version and a hash of the chart code, see
+figure_cache.figure_version), so figures of a replaced CSV file or of an
+earlier release are never served; they are deleted on reload and at
+startup and otherwise age out under the size limit.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS figures (
+    key TEXT PRIMARY KEY,
+    dataset TEXT NOT NULL,
+    version TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL
+)
+"""
+
+# Check the total size after this many writes from a process, and evict
+# down to this fraction of the limit
+EVICT_EVERY = 64
+EVICT_TO = 0.9
+
+
+class DiskFigureStore:
+    def __init__(self, directory, max_bytes):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "figures.sqlite3")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._local = threading.local()
+        with self._connect() as db:
+            db.execute(SCHEMA)
+
+    def _connect(self):
+        # One connection per thread and process; a connection inherited
+        # through fork must not be used by the child
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def key_string(key):
+        return json.dumps(key, separators=(",", ":"))
+
+    def get(self, key):
+        row = self._connect().execute(
+            "SELECT payload FROM figures WHERE key = ?", (self.key_string(key),)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, key, payload):
+        # key is (dataset, figure version, ...) as built by cached_figure
+        if len(payload) > self.max_bytes:
+            return
+        db = self._connect()
+        db.execute("INSERT OR REPLACE INTO figures VALUES (?, ?, ?, ?, ?, ?)",
+                   (self.key_string(key), key[0], key[1], payload, len(payload), time.time()))
+        self._writes += 1
+        if self._writes % EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        # Past max_bytes, drop the oldest figures down to 90% of it
+        db = self._connect()
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM figures").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - int(self.max_bytes * EVICT_TO)
+        doomed = []
+        for key, size in db.execute("SELECT key, size FROM figures ORDER BY created"):
+            if excess <= 0:
+                break
+            doomed.append((key,))
+            excess -= size
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany("DELETE FROM figures WHERE key = ?", doomed)
+            db.execute("COMMIT")
+        except sqlite3.Error:
+            # Don't leave this thread's connection inside the transaction
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            raise
+
+    def discard_stale(self, dataset, version):
+        # Delete the figures of every other figure version of a dataset
+        self._connect().execute("DELETE FROM figures WHERE dataset = ? AND version != ?", (dataset, version))
+
+    def clear(self):
+        self._connect().execute("DELETE FROM figures")
+
+    def stats(self):
+        entries, size = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM figures").fetchone()
+        return {"entries": entries, "bytes": size, "hits": self.hits, "misses": self.misses}
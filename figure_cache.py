@@ -0,0 +1,154 @@
+"""Memoized chart figures for the dashboard callbacks.
+
+The chart callbacks are pure functions of (slider range, indicator) over
+the loaded data, so their figures are serialized once and served from a
+bounded LRU cache afterwards. An optional shared store (disk_cache.py) sits
+behind the LRU so that worker processes reuse each other's figures.
+"""
+import functools
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import plotly.io as pio
+
+from charts import RENDER_VERSION
+from metrics import count_cache_lookup, observe_build, phase
+
+logger = logging.getLogger(__name__)
+
+
+class FigureCache:
+    def __init__(self, max_entries, max_bytes, shared=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self.shared = shared
+        self._entries = OrderedDict()  # key -> serialized figure JSON
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key, payload):
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old)
+            self._entries[key] = payload
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+
+    def get_or_build(self, key, build):
+        payload = self.get(key)
+        if payload is not None:
+            count_cache_lookup("memory")
+            return payload
+        if self.shared is not None:
+            # The shared store only saves work: when it fails (locked, full or
+            # corrupt file), the figure is built and kept in this process
+            try:
+                payload = self.shared.get(key)
+            except sqlite3.Error as e:
+                logger.warning("Shared figure cache lookup failed, building the figure: %s", e)
+            if payload is not None:
+                count_cache_lookup("shared")
+                self.put(key, payload)
+                return payload
+        count_cache_lookup("miss")
+        payload = build()
+        if not isinstance(payload, str):
+            # Builders may return the figure already serialized (see figure_pool.py)
+            with phase("serialize"):
+                payload = pio.to_json(payload, validate=False)
+        self.put(key, payload)
+        if self.shared is not None:
+            try:
+                self.shared.put(key, payload)
+            except sqlite3.Error as e:
+                logger.warning("Could not store a figure in the shared figure cache: %s", e)
+        return payload
+
+    def invalidate(self, predicate):
+        # Drop every entry whose key matches predicate; returns the dropped keys
+        with self._lock:
+            stale = [key for key in self._entries if predicate(key)]
+            for key in stale:
+                self.bytes -= len(self._entries.pop(key))
+        return stale
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "shared": self.shared.stats() if self.shared is not None else None,
+        }
+
+
+def figure_version(snapshot, dataset):
+    # Version of a dataset's figures: they change with its data and with the
+    # code that draws them
+    return f"{snapshot.version(dataset)}-{RENDER_VERSION}"
+
+
+def cached_figure(cache, data_source, dataset):
+    # Decorator for chart builders taking (selected_range, selected_indicator,
+    # snapshot); the wrapper is called with the first two. Keys start with the
+    # dataset name and figure_version, and the key and the build read the same data
+    # snapshot, so a data reload never serves or stores a figure under the
+    # wrong version.
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(selected_range, selected_indicator):
+            snapshot = data_source.snapshot()
+            key = (dataset, figure_version(snapshot, dataset), func.__name__, selected_indicator, tuple(selected_range))
+
+            def build():
+                start = time.perf_counter()
+                figure = func(selected_range, selected_indicator, snapshot)
+                label = selected_indicator if snapshot.store(dataset).has_label(selected_indicator) else "other"
+                observe_build(dataset, label, time.perf_counter() - start)
+                return figure
+
+            payload = cache.get_or_build(key, build)
+            # Parsed with orjson when it is installed, like plotly's own JSON
+            with phase("decode"):
+                return pio.json.from_json_plotly(payload)
+        return wrapper
+    return decorator
@@ -0,0 +1,118 @@
+"""Optional process pool for building chart figures on cache misses.
+
+Building a figure (plotly express, JSON serialization) holds the GIL, so
+on threaded workers one expensive miss stalls every other request in the
+process. With BTR_FIGURE_POOL_WORKERS set, cache misses are built in a
+small pool of processes with their own copy of the data instead, and the
+request thread only waits for the serialized figure. Cache hits never get
+here. If the pool is busy, slow, broken or holds a different version of
+the data, the caller builds the figure in-process as before.
+"""
+import concurrent.futures
+import logging
+import multiprocessing
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import plotly.io as pio
+
+from chart_specs import chart_spec
+from charts import chart_meta, render_chart
+from data_source import DataSource
+
+logger = logging.getLogger(__name__)
+
+
+class StaleData(Exception):
+    pass
+
+
+# The data of a pool process, loaded by _init_process
+_data_source = None
+
+
+def _init_process(paths, compiled_dir):
+    global _data_source
+    _data_source = DataSource(paths, compiled_dir=compiled_dir)
+
+
+def _build(dataset, version, indicator, columns, axis):
+    # Runs in a pool process; columns is (IndicatorStore method, arguments)
+    if _data_source.version(dataset) != version:
+        _data_source.check()
+        if _data_source.version(dataset) != version:
+            raise StaleData(f"{dataset} is at {_data_source.version(dataset)}, not {version}")
+    store = _data_source.store(dataset)
+    method, args = columns
+    fig = render_chart(store, chart_spec(dataset, indicator), getattr(store, method)(*args), axis,
+                       chart_meta(dataset, indicator, version))
+    return pio.to_json(fig, validate=False)
+
+
+class FigurePool:
+    def __init__(self, paths, workers, timeout, compiled_dir=None):
+        self.paths = dict(paths)
+        self.compiled_dir = compiled_dir
+        self.workers = workers
+        self.timeout = timeout
+        self.built = 0
+        self.fallbacks = 0
+        self._executor = None
+        self._lock = threading.Lock()
+        # At most two waiting builds per pool process; beyond that, build in-process
+        self._slots = threading.BoundedSemaphore(workers * 2)
+
+    def _get_executor(self):
+        # Started on first use, i.e. in each server worker after the fork.
+        # spawn, because forking a process that runs threads is not safe.
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_process, initargs=(self.paths, self.compiled_dir))
+            return self._executor
+
+    def _reset(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def build(self, dataset, version, indicator, columns, axis):
+        # Serialized figure built in the pool, or None to build it in-process
+        if not self._slots.acquire(blocking=False):
+            self.fallbacks += 1
+            return None
+        try:
+            executor = self._get_executor()
+            future = executor.submit(_build, dataset, version, indicator, columns, axis)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the build is done, not until we stop waiting:
+        # a build that timed out keeps its pool process busy until it finishes
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            payload = future.result(timeout=self.timeout)
+        except concurrent.futures.TimeoutError:
+            # Only drops the build if it hasn't started yet
+            future.cancel()
+            logger.warning("Figure pool timed out after %ss on %s %r", self.timeout, dataset, indicator)
+        except BrokenProcessPool:
+            logger.exception("Figure pool died; starting a new one on the next miss")
+            self._reset(executor)
+        except StaleData:
+            pass
+        except Exception as e:
+            logger.warning("Figure pool failed on %s %r: %s", dataset, indicator, e)
+        else:
+            self.built += 1
+            return payload
+        self.fallbacks += 1
+        return None
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
@@ -0,0 +1,60 @@
+"""gunicorn settings for the dashboard: gunicorn -c gunicorn.conf.py apps:server
+
+Every value can be overridden with the environment variable next to it.
+"""
+import gc
+import multiprocessing
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8051')}"
+
+# The callbacks are mostly cached lookups and numpy slicing, so a few threads
+# per worker keep each process busy without multiplying the per-worker memory.
+# Every worker holds its own figure LRU (BTR_FIGURE_CACHE_MAX_MB) and long
+# tables, so gthread runs one worker per core: its threads already overlap
+# the I/O that 2 x cores + 1 sync workers are there to cover.
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+default_workers = multiprocessing.cpu_count() if worker_class == "gthread" else multiprocessing.cpu_count() * 2 + 1
+workers = int(os.environ.get("WEB_CONCURRENCY", default_workers))
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+
+# Import apps.py (data store, parsed tables and, with BTR_WARM_FIGURE_CACHE,
+# the figure cache) once in the master, then fork: workers share those pages
+# copy-on-write instead of each parsing and building their own
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") not in ("0", "false", "no")
+
+# Workers share the figures they build through a SQLite file (disk_cache.py);
+# run prewarm.py with the same directory before starting to fill it
+os.environ.setdefault("BTR_FIGURE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "btr-figure-cache"))
+
+# Workers and figure pool processes map the same compiled copy of the CSV
+# files (compiled_data.py) instead of each parsing them; compile_data.py
+# builds it ahead of the deploy, otherwise the first process to load does
+os.environ.setdefault("BTR_COMPILED_DATA_DIR", os.path.join(tempfile.gettempdir(), "btr-compiled-data"))
+
+# Each worker writes its /metrics samples to files here and /metrics adds up
+# every worker's (metrics.py). Emptied at startup, since the files of an
+# earlier run's processes would otherwise be counted too.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "btr-metrics"))
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+for name in os.listdir(os.environ["PROMETHEUS_MULTIPROC_DIR"]):
+    if name.endswith(".db"):
+        os.remove(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], name))
+
+# Keep browser/proxy connections open between slider drags
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", "5"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+
+
+def when_ready(server):
+    # Move everything the preloaded app allocated out of the collector's reach,
+    # so garbage collection in the workers doesn't touch (and copy) those pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import apps
+    apps.start_background_tasks()
+
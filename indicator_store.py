@@ -0,0 +1,313 @@
+"""Pre-parsed numeric indicator tables for the dashboard.
+
+The CSV files keep their numbers as quoted, comma-grouped strings. An
+IndicatorStore parses them once into a float64 matrix (rows = indicators,
+columns = periods) so the chart callbacks only have to slice by position.
+The columns are sorted by a typed PeriodIndex, so a period range is found
+with searchsorted and returned as a view of the matrix. The arrays are
+read-only, so a store can be shared by request threads without locks.
+pandas is only imported to parse a CSV file or to hand a long table to
+plotly express, so a process starting from a compiled file (see
+compiled_data.py) doesn't load it until it builds its first figure.
+
+Labels such as "On domestic debt" repeat under different parent rows, so
+every row is keyed by (section, indicator) instead of by its label alone.
+"""
+import functools
+import re
+
+import numpy as np
+
+# Period kinds found in the CSV column headers
+ANNUAL = "annual"
+MONTHLY = "monthly"
+QUARTERLY = "quarterly"
+
+_PERIOD_PATTERNS = [
+    (ANNUAL, re.compile(r"^\d{4}$")),                # 2006
+    (MONTHLY, re.compile(r"^[A-Z][a-z]{2}-\d{4}$")),  # Jan-2024
+    (QUARTERLY, re.compile(r"^[1-4]Q\d{4}$")),       # 1Q2024
+]
+
+
+# Section header rows and the labels of their direct child rows, in file
+# order, per CSV (keyed by the label column name). A child may itself be a
+# header. Rows outside any section belong to the root section (the label
+# column name). Adding or removing a row in a section means updating its
+# list here: the files carry no structure of their own, so section_keys
+# checks every section against these lists rather than guess.
+SECTIONS = {
+    "Fiscal Indicators": {
+        "Revenues": ("Tax revenues", "Non-tax revenues, including grants"),
+        "Tax revenues": ("BIR collections", "BOC collections"),
+        "Non-tax revenues, including grants": ("BTr income",),
+        "Gross financing": ("Domestic financing 1", "External financing 1"),
+        "Financing mix (percent distribution of gross borrowing)": ("Domestic financing  2", "External financing 2"),
+        "Amortization": ("Domestic amortization", "Redemptions from BSF", "External amortization"),
+        "Net financing": ("Domestic financing 3", "External financing 3"),
+        "Interest payments": (
+            "As share of revenues (percent)",
+            "As share of expenditures (percent)",
+            "As share of GDP (percent)",
+        ),
+    },
+    "Debt Indicators": {
+        "Outstanding debt": ("Domestic debt", "External debt"),
+        "Debt guaranteed by the NG": ("Domestic guarantees", "External guarantees"),
+        "Outstanding debt (percent of GDP)": ("Domestic debt (percent of GDP)", "External debt (percent of GDP)"),
+        "Debt service payments": ("On domestic debt", "On external debt"),
+        "Principal payments": ("On domestic debt", "On external debt"),
+        "Interest payments": ("On domestic debt", "On external debt"),
+        "Distribution by maturity type 3/": (
+            "Short-term debt, <1 year (type 1)",
+            "Medium-term debt, 1 year to 5 years (type 1)",
+            "Long-term debt, >5 years (type 1)",
+        ),
+        "Distribution by maturity type (percent of total)": (
+            "Short-term debt, <1 year (type 2)",
+            "Medium-term debt, 1 year to 5 years (type 2)",
+            "Long-term debt, >5 years (type 2)",
+        ),
+        "Total debt by currency (in billion pesos)": (
+            "Philippine peso (PHP)",
+            "US dollar (USD)",
+            "Japanese yen (JPY)",
+            "Euro (EUR)",
+            "Chinese renminbi (CNY)",
+            "Other currencies 1",
+        ),
+        "Total debt by currency (percent of total)": ("PHP", "USD", "JPY", "EUR", "CNY", "Other currencies 2"),
+        "Weighted average interest rate (percent)": ("On domestic debt (percent)", "On external debt (percent)"),
+    },
+}
+
+
+def section_keys(root, labels, sections):
+    # Walk the rows in file order and return a (section, indicator) key per row
+    keys = []
+    stack = [[root, None, 0]]  # [section, its child labels (None: the root), children seen]
+    for row, label in enumerate(labels):
+        while stack[-1][1] is not None and stack[-1][2] == len(stack[-1][1]):
+            stack.pop()
+        parent = stack[-1]
+        section, children, seen = parent
+        if children is not None and label != children[seen]:
+            raise ValueError(f"{root}: row {row + 2} is {label!r}, but section {section!r} should go on with "
+                             f"{children[seen]!r}; update SECTIONS in indicator_store.py if the file changed")
+        keys.append((section, label))
+        parent[2] += 1
+        if label in sections:
+            stack.append([label, sections[label], 0])
+    missing = [section for section in sections if section not in labels]
+    if missing:
+        raise ValueError(f"{root}: section rows missing: {', '.join(missing)}")
+    unfinished = [f"{section} ({len(children) - seen} rows short)" for section, children, seen in stack[1:]
+                  if seen < len(children)]
+    if unfinished:
+        raise ValueError(f"{root}: the file ends inside {', '.join(unfinished)}")
+    return keys
+
+
+def period_kind(label):
+    for kind, pattern in _PERIOD_PATTERNS:
+        if pattern.match(label):
+            return kind
+    raise ValueError(f"Unrecognised period column: {label!r}")
+
+
+KIND_CODES = {ANNUAL: 0, MONTHLY: 1, QUARTERLY: 2}
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+def parse_period(label):
+    # "2006" -> (annual, 2006, 0); "Feb-2024" -> (monthly, 2024, 2); "1Q2024" -> (quarterly, 2024, 1)
+    kind = period_kind(label)
+    if kind == ANNUAL:
+        return kind, int(label), 0
+    if kind == MONTHLY:
+        return kind, int(label[4:]), MONTHS.index(label[:3]) + 1
+    return kind, int(label[2:]), int(label[0])
+
+
+def period_code(kind_code, year, sub):
+    # Sort key: every annual column by year, then each year's months followed by its quarters
+    return (kind_code > 0) * 10**7 + year * 1000 + kind_code * 100 + sub
+
+
+def read_only(*arrays):
+    # Stores are shared by every request thread: nothing may write to them
+    for array in arrays:
+        array.setflags(write=False)
+
+
+class PeriodIndex:
+    def __init__(self, labels):
+        parsed = [parse_period(label) for label in labels]
+        kinds = np.array([KIND_CODES[kind] for kind, _, _ in parsed], dtype=np.int64)
+        years = np.array([year for _, year, _ in parsed], dtype=np.int64)
+        subs = np.array([sub for _, _, sub in parsed], dtype=np.int64)
+        codes = period_code(kinds, years, subs)
+        if len(np.unique(codes)) != len(codes):
+            raise ValueError("Duplicate period columns")
+
+        # Column order of the value matrix, relative to the order of `labels`
+        self.order = np.argsort(codes, kind="stable")
+        self.labels = np.asarray(labels, dtype=object)[self.order]
+        self.kinds = kinds[self.order].astype(np.int8)
+        self.years = years[self.order].astype(np.int16)
+        self.subs = subs[self.order].astype(np.int8)
+        self.codes = codes[self.order]
+        read_only(self.order, self.labels, self.kinds, self.years, self.subs, self.codes)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def annual(self, start_year, end_year):
+        # Annual columns from start_year to end_year inclusive
+        lo = np.searchsorted(self.codes, period_code(0, start_year, 0), side="left")
+        hi = np.searchsorted(self.codes, period_code(0, end_year, 0), side="right")
+        return slice(int(lo), int(hi))
+
+    def subannual(self, year):
+        # The months and quarters of one year
+        lo = np.searchsorted(self.codes, period_code(1, year, 0), side="left")
+        hi = np.searchsorted(self.codes, period_code(1, year + 1, 0), side="left")
+        return slice(int(lo), int(hi))
+
+
+def parse_values(frame):
+    # "1,234,567" -> 1234567.0; "-", "n.a." and blanks -> NaN
+    import pandas as pd
+
+    cleaned = frame.apply(lambda col: pd.to_numeric(col.str.replace(",", ""), errors="coerce"))
+    return cleaned.to_numpy(dtype=np.float64)
+
+
+class IndicatorStore:
+    def __init__(self, label_name, labels, periods, values, sections=None):
+        self.label_name = label_name
+        self.labels = np.array(labels, dtype=object)
+        self.keys = section_keys(label_name, labels, sections or {})
+        self.period_index = PeriodIndex(periods)
+        self.periods = self.period_index.labels
+        values = np.asarray(values, dtype=np.float64)
+        if np.array_equal(self.period_index.order, np.arange(len(self.period_index))):
+            # Columns already sorted (e.g. a compiled file): keep the array, or memory map, as it is
+            self.values = np.ascontiguousarray(values)
+        else:
+            self.values = np.ascontiguousarray(values[:, self.period_index.order])
+        read_only(self.labels, self.values)
+
+        self.index = {}
+        self._sections = {}
+        self._label_rows = {}
+        for i, key in enumerate(self.keys):
+            if key in self.index:
+                raise ValueError(f"Duplicate indicator {key!r} in {label_name}")
+            self.index[key] = i
+            self._sections.setdefault(key[0], []).append(i)
+            self._label_rows.setdefault(key[1], []).append(i)
+        self._long_tables = {}
+
+    @classmethod
+    def from_csv(cls, path):
+        # path is a file name or a binary file object
+        import pandas as pd
+
+        df = pd.read_csv(path, dtype=str)
+        label_name = df.columns[0]
+        # Only the dashboard's own tables: a new release of a file has to match
+        # them before it is served (period headers and sections are checked
+        # as the store is built)
+        if label_name not in SECTIONS:
+            raise ValueError(f"Unknown table: label column {label_name!r}")
+        if df.empty or len(df.columns) < 2:
+            raise ValueError(f"{label_name}: no indicator rows or no period columns")
+        return cls(label_name, df[label_name].tolist(), list(df.columns[1:]), parse_values(df.iloc[:, 1:]),
+                   SECTIONS.get(label_name))
+
+    def rows(self, keys):
+        return [self.index[key] for key in keys]
+
+    def children(self, section):
+        # Direct child rows of a section header, in file order
+        return list(self._sections.get(section, []))
+
+    def has_label(self, label):
+        return isinstance(label, str) and label in self._label_rows
+
+    def find(self, indicator):
+        # Row of an indicator whose label is unique across all sections
+        rows = self._label_rows[indicator]
+        if len(rows) > 1:
+            raise KeyError(f"{indicator!r} is ambiguous, look it up by (section, indicator)")
+        return rows[0]
+
+    def annual_range(self, start_year, end_year):
+        return self.period_index.annual(start_year, end_year)
+
+    def subannual_range(self, year, first, last):
+        # Columns first..last (1-based, inclusive) of a year's months and
+        # quarters. The positions come from the slider, so they are clamped to
+        # the year: no other year's columns, even for forged values.
+        block = self.period_index.subannual(year)
+        return slice(block.start + max(first, 1) - 1, max(min(block.start + last, block.stop), block.start))
+
+    def subannual_labels(self, year):
+        return list(self.periods[self.period_index.subannual(year)])
+
+    def block(self, rows, columns):
+        # Values of the given rows over a column slice; the column slice is a view
+        return self.values[:, columns][rows]
+
+    def long_table(self, rows):
+        # Long-format table of these rows, built on first use and kept with the store
+        key = tuple(rows)
+        table = self._long_tables.get(key)
+        if table is None:
+            table = self._long_tables[key] = LongTable(self, rows)
+        return table
+
+
+class LongTable:
+    # (label, period, value) rows of some indicators, sorted by period and then
+    # by the given row order, with missing values dropped. offsets[p] is the
+    # first table row of period column p, so a column slice is a row slice.
+    def __init__(self, store, rows):
+        block = store.values[rows]
+        n_rows, n_periods = block.shape
+        values = block.T.ravel()
+        keep = ~np.isnan(values)
+        self.series = list(store.labels[rows])
+        self._label_name = store.label_name
+        self._periods = store.periods
+        self._series_codes = np.tile(np.arange(n_rows, dtype=np.int32), n_periods)[keep]
+        self._period_codes = np.repeat(np.arange(n_periods, dtype=np.int32), n_rows)[keep]
+        self._values = values[keep]
+        present = keep.reshape(n_periods, n_rows)
+        self.offsets = np.concatenate([[0], np.cumsum(present.sum(axis=1))])
+        # Series with at least one value, i.e. the ones a chart of the table draws
+        self.drawn = np.flatnonzero(present.any(axis=0)).tolist()
+
+    @functools.cached_property
+    def frame(self):
+        # The table as a DataFrame with categorical label and period columns, for plotly express
+        import pandas as pd
+
+        return pd.DataFrame({
+            self._label_name: pd.Categorical.from_codes(self._series_codes, self.series),
+            "Period": pd.Categorical.from_codes(self._period_codes, self._periods),
+            "Value": self._values,
+        })
+
+    def series_data(self, columns):
+        # (periods, values) of every drawn series within a column slice, in series order
+        rows = slice(self.offsets[columns.start], self.offsets[columns.stop])
+        series_codes = self._series_codes[rows]
+        period_codes = self._period_codes[rows]
+        values = self._values[rows]
+        data = []
+        for code in self.drawn:
+            match = series_codes == code
+            data.append((self._periods[period_codes[match]], values[match]))
+        return data
@@ -0,0 +1,299 @@
+"""Load test of the dashboard running under gunicorn.
+
+    python loadtest.py --workers 1,2,4 --worker-class gthread,sync --users 1,4,16,32
+
+starts gunicorn with gunicorn.conf.py on localhost for every combination of
+worker count and worker class, and runs simulated user sessions against it
+at each number of concurrent users in turn. A session loads the page shell,
+opens the home page (its clock ticks in the browser, so it makes no
+requests), navigates to /data and /2024 through display_page and drags the
+year-slider and period-slider-2024 a few times on each, choosing among the
+indicators and slider marks the server sent (a changed indicator is one
+more request, as its dropdown would send). Every step goes through
+/_dash-update-component with the chart stamps the page holds, as a browser would.
+
+For every user count it reports throughput, latency percentiles per
+request kind and the error rate, i.e. a saturation curve per server
+configuration; --output also saves them as JSON. Each server starts with
+an empty shared figure cache. The simulated users run on the same machine
+as the server, so leave cores free for them when reading the curves.
+"""
+import argparse
+import gzip
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# gzip only, so the client can read the layouts it gets back without Brotli
+HEADERS = {"Accept-Encoding": "gzip"}
+MAIN_GRAPHS = ["fiscal-chart", "debt-chart"]
+GRAPHS_2024 = ["fiscal-chart-2024", "debt-chart-2024"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def callback_body(outputs, inputs, changed, state=()):
+    # /_dash-update-component request for outputs ["id.prop"], inputs and state [(id, prop, value)]
+    if len(outputs) == 1:
+        output = outputs[0]
+    else:
+        output = ".." + "...".join(outputs) + ".."
+    return {
+        "output": output,
+        "outputs": [dict(zip(("id", "property"), o.split("."))) for o in outputs] if len(outputs) > 1
+        else dict(zip(("id", "property"), outputs[0].split("."))),
+        "inputs": [{"id": i, "property": p, "value": v} for i, p, v in inputs],
+        "state": [{"id": i, "property": p, "value": v} for i, p, v in state],
+        "changedPropIds": changed,
+    }
+
+
+def find_components(layout):
+    # id -> props of every component with an id in a serialized layout
+    found = {}
+    stack = [layout]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, dict):
+            props = node.get("props", {})
+            if "id" in props:
+                found[props["id"]] = props
+            stack.append(props.get("children"))
+    return found
+
+
+class Server:
+    # gunicorn running apps:server with gunicorn.conf.py on a free local port
+    def __init__(self, workers, worker_class, threads):
+        self.port = free_port()
+        self.cache_dir = tempfile.mkdtemp(prefix="btr-loadtest-")
+        self.log_path = os.path.join(self.cache_dir, "gunicorn.log")
+        env = dict(os.environ, PORT=str(self.port), WEB_CONCURRENCY=str(workers),
+                   GUNICORN_WORKER_CLASS=worker_class, GUNICORN_THREADS=str(threads),
+                   BTR_FIGURE_CACHE_DIR=os.path.join(self.cache_dir, "figures"),
+                   PROMETHEUS_MULTIPROC_DIR=os.path.join(self.cache_dir, "metrics"))
+        self._log = open(self.log_path, "wb")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{self.port}",
+             "apps:server"], cwd=ROOT, env=env, stdout=self._log, stderr=subprocess.STDOUT)
+
+    def wait_ready(self, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+                conn.request("GET", "/_dash-layout")
+                if conn.getresponse().status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.5)
+        self.stop()
+        with open(self.log_path, errors="replace") as f:
+            log = f.read()[-3000:]
+        raise RuntimeError(f"gunicorn did not start on port {self.port}:\n{log}")
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self._log.close()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+
+class User(threading.Thread):
+    # One simulated browser session, repeated until stop is set
+    def __init__(self, port, stop, think, drags, seed):
+        super().__init__(daemon=True)
+        self.port = port
+        self.stop = stop
+        self.think = think
+        self.drags = drags
+        self.random = random.Random(seed)
+        self.records = []  # (kind, start, seconds, ok)
+        self.conn = None
+
+    def request(self, kind, method, path, body=None):
+        headers = dict(HEADERS)
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        start = time.monotonic()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+            self.conn.request(method, path, data, headers)
+            response = self.conn.getresponse()
+            content = response.read()
+            ok = 200 <= response.status < 300
+        except (OSError, http.client.HTTPException):
+            if self.conn is not None:
+                self.conn.close()
+            self.conn = None
+            content, ok = None, False
+        self.records.append((kind, start, time.monotonic() - start, ok))
+        if ok and response.getheader("Content-Encoding") == "gzip":
+            content = gzip.decompress(content)
+        return content if ok else None
+
+    def pause(self):
+        if self.think:
+            self.stop.wait(self.random.expovariate(1 / self.think))
+
+    def navigate(self, pathname):
+        body = callback_body(["page-content.children"], [("url", "pathname", pathname)], ["url.pathname"])
+        content = self.request("display_page", "POST", "/_dash-update-component", body)
+        if content is None:
+            return None
+        return find_components(json.loads(content)["response"]["page-content"]["children"])
+
+    def drag(self, kind, graphs, slider, dropdowns, components):
+        # Each chart's figure and <graph>-meta store are outputs; the stores are
+        # sent back as state, updated from the responses like the browser's
+        metas = [f"{graph}-meta" for graph in graphs]
+        outputs = [f"{graph}.figure" for graph in graphs] + [f"{meta}.data" for meta in metas]
+        stamps = [components[meta]["data"] for meta in metas]
+
+        def update(label, inputs, changed):
+            content = self.request(label, "POST", "/_dash-update-component",
+                                   callback_body(outputs, inputs, changed, zip(metas, ["data"] * 2, stamps)))
+            response = json.loads(content)["response"] if content is not None else {}
+            for i, meta in enumerate(metas):
+                if meta in response:
+                    stamps[i] = response[meta]["data"]
+
+        marks = sorted(int(m) for m in components[slider]["marks"])
+        selected = components[slider]["value"]
+        indicators = [components[d]["value"] for d in dropdowns]
+        for i, dropdown in enumerate(dropdowns):
+            options = components[dropdown]["options"]
+            if options and self.random.random() < 0.5:
+                indicators[i] = self.random.choice(options)["value"]
+                inputs = [(slider, "value", selected)] + list(zip(dropdowns, ["value"] * 2, indicators))
+                update(dropdown, inputs, [f"{dropdown}.value"])
+        for _ in range(self.drags):
+            if self.stop.is_set():
+                return
+            selected = sorted(self.random.sample(marks, 2)) if len(marks) > 1 else [marks[0], marks[0]]
+            inputs = [(slider, "value", selected)] + list(zip(dropdowns, ["value"] * 2, indicators))
+            update(kind, inputs, [f"{slider}.value"])
+            self.pause()
+
+    def session(self):
+        self.request("page", "GET", "/")
+        self.request("layout", "GET", "/_dash-layout")
+        self.request("dependencies", "GET", "/_dash-dependencies")
+        self.navigate("/")
+        self.pause()
+        components = self.navigate("/data")
+        if components:
+            self.drag("year-slider", MAIN_GRAPHS, "year-slider",
+                      ["fiscal-indicator-dropdown", "debt-indicator-dropdown"], components)
+        components = self.navigate("/2024")
+        if components:
+            self.drag("period-slider-2024", GRAPHS_2024, "period-slider-2024",
+                      ["fiscal-indicator-dropdown-2024", "debt-indicator-dropdown-2024"], components)
+
+    def run(self):
+        while not self.stop.is_set():
+            self.session()
+        if self.conn is not None:
+            self.conn.close()
+
+
+def percentiles(seconds):
+    ms = np.array(seconds) * 1000
+    return {f"p{p}_ms": round(float(np.percentile(ms, p)), 2) for p in (50, 95, 99)}
+
+
+def run_level(port, users, duration, warmup, think, drags):
+    # Requests started within [warmup, warmup + duration) of the run count
+    stop = threading.Event()
+    threads = [User(port, stop, think, drags, seed) for seed in range(users)]
+    start = time.monotonic()
+    for t in threads:
+        t.start()
+    time.sleep(warmup + duration)
+    stop.set()
+    for t in threads:
+        t.join(60)
+    window = (start + warmup, start + warmup + duration)
+    records = [r for t in threads for r in t.records if window[0] <= r[1] < window[1]]
+    by_kind = {}
+    for kind, _, seconds, ok in records:
+        by_kind.setdefault(kind, []).append((seconds, ok))
+    result = {"users": users, "requests": len(records),
+              "throughput_rps": round(len(records) / duration, 1),
+              "error_rate": round(sum(not ok for *_, ok in records) / max(len(records), 1), 4)}
+    if records:
+        result.update(percentiles([r[2] for r in records]))
+    result["kinds"] = {kind: dict(percentiles([s for s, _ in rs]), requests=len(rs),
+                                  errors=sum(not ok for _, ok in rs))
+                       for kind, rs in sorted(by_kind.items())}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4", help="gunicorn worker counts (default 1,2,4)")
+    parser.add_argument("--worker-class", default="gthread", help="gunicorn worker classes (default gthread)")
+    parser.add_argument("--threads", type=int, default=4, help="threads per gthread worker (default 4)")
+    parser.add_argument("--users", default="1,4,16,32", help="concurrent users, in turn (default 1,4,16,32)")
+    parser.add_argument("--duration", type=float, default=20, help="measured seconds per user count")
+    parser.add_argument("--warmup", type=float, default=3, help="unmeasured seconds before each")
+    parser.add_argument("--think", type=float, default=0.0,
+                        help="mean seconds between a user's actions (default 0: as fast as possible)")
+    parser.add_argument("--drags", type=int, default=5, help="slider drags per page visit (default 5)")
+    parser.add_argument("--start-timeout", type=float, default=300, help="seconds to wait for gunicorn")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for worker_class in args.worker_class.split(","):
+        for workers in [int(w) for w in args.workers.split(",")]:
+            name = f"{workers} x {worker_class}" + (f" ({args.threads} threads)" if worker_class == "gthread" else "")
+            print(f"== {name}")
+            server = Server(workers, worker_class, args.threads)
+            try:
+                server.wait_ready(args.start_timeout)
+                print(f"{'users':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+                for users in [int(u) for u in args.users.split(",")]:
+                    level = run_level(server.port, users, args.duration, args.warmup, args.think, args.drags)
+                    level.update(workers=workers, worker_class=worker_class, threads=args.threads)
+                    results.append(level)
+                    print(f"{users:5} {level['throughput_rps']:8.1f} {level.get('p50_ms', 0):8.1f} "
+                          f"{level.get('p95_ms', 0):8.1f} {level.get('p99_ms', 0):8.1f} {level['error_rate']:7.2%}")
+            finally:
+                server.stop()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "args": vars(args), "results": results},
+                      f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""Per-callback timings and figure cache counters, served on /metrics.
+
+Every server-side callback is timed as a whole, and the chart code times
+its phases inside it: picking the data of a slider range (slice), building
+the plotly figure (figure), packing its data into typed arrays (pack),
+serializing it for the cache (serialize), parsing a cached figure (decode),
+building a range patch (patch) and waiting for the figure pool (pool). Figure cache lookups are counted per
+callback and result, builds per indicator, and callback responses are
+measured in bytes. /metrics serves all of it in the Prometheus text format,
+to requests with BTR_METRICS_TOKEN as a bearer token or, without a token,
+only to requests from this machine.
+
+Nothing is recorded until init_app() is called, so the figure pool
+processes, prewarm.py and benchmark.py don't pay for it. Under gunicorn
+the workers write to PROMETHEUS_MULTIPROC_DIR (see gunicorn.conf.py) and
+/metrics adds them up.
+"""
+import contextlib
+import contextvars
+import functools
+import hmac
+import os
+import time
+
+import flask
+from dash.exceptions import PreventUpdate
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+# Addresses served /metrics when there is no token
+LOOPBACK = ("127.0.0.1", "::1")
+
+# Name of the callback running on this thread, for the phase and cache labels
+_callback = contextvars.ContextVar("callback", default="background")
+# Metric objects, created by init_app
+_metrics = None
+
+
+class Metrics:
+    def __init__(self):
+        from prometheus_client import Counter, Histogram
+
+        self.callback_seconds = Histogram(
+            "btr_callback_seconds", "Time spent in a server-side callback", ["callback"], buckets=LATENCY_BUCKETS)
+        self.callback_errors = Counter(
+            "btr_callback_errors", "Callbacks that raised an exception", ["callback"])
+        self.phase_seconds = Histogram(
+            "btr_callback_phase_seconds", "Time spent in one phase of a callback", ["callback", "phase"],
+            buckets=LATENCY_BUCKETS)
+        self.response_bytes = Histogram(
+            "btr_callback_response_bytes", "Uncompressed size of callback responses", ["callback"],
+            buckets=SIZE_BUCKETS)
+        self.cache_lookups = Counter(
+            "btr_figure_cache_lookups", "Figure cache lookups by result (memory, shared or miss)",
+            ["callback", "result"])
+        self.builds = Counter(
+            "btr_figure_builds", "Figures built on a cache miss", ["dataset", "indicator"])
+        self.build_seconds = Counter(
+            "btr_figure_build_seconds", "Time spent building figures on cache misses", ["dataset", "indicator"])
+
+
+@contextlib.contextmanager
+def phase(name):
+    if _metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _metrics.phase_seconds.labels(_callback.get(), name).observe(time.perf_counter() - start)
+
+
+def count_cache_lookup(result):
+    if _metrics is not None:
+        _metrics.cache_lookups.labels(_callback.get(), result).inc()
+
+
+def observe_build(dataset, indicator, seconds):
+    # indicator is a label from the request: the caller passes "other" for
+    # anything that isn't a row of the dataset, so clients can't add series
+    if _metrics is not None:
+        _metrics.builds.labels(dataset, indicator).inc()
+        _metrics.build_seconds.labels(dataset, indicator).inc(seconds)
+
+
+def timed_callback(func):
+    # Decorator for the Dash callbacks, inside @callback
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _metrics is None:
+            return func(*args, **kwargs)
+        name = func.__name__
+        token = _callback.set(name)
+        flask.g.btr_callback = name
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except PreventUpdate:
+            raise
+        except Exception:
+            _metrics.callback_errors.labels(name).inc()
+            raise
+        finally:
+            _metrics.callback_seconds.labels(name).observe(time.perf_counter() - start)
+            _callback.reset(token)
+    return wrapper
+
+
+def record_response_size(response):
+    name = flask.g.get("btr_callback")
+    if name is not None and not response.direct_passthrough:
+        _metrics.response_bytes.labels(name).observe(response.calculate_content_length() or 0)
+    return response
+
+
+def allowed(request, token):
+    if token:
+        header = request.headers.get("Authorization", "")
+        return hmac.compare_digest(header.encode(), f"Bearer {token}".encode())
+    return request.remote_addr in LOOPBACK
+
+
+def serve_metrics(token):
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+    from prometheus_client import multiprocess
+
+    if not allowed(flask.request, token):
+        flask.abort(403)
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # Add up the files of every worker process
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return flask.Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def init_app(server, token=None):
+    # Call after enable_compression, so responses are measured before compression
+    global _metrics
+    if _metrics is None:
+        _metrics = Metrics()
+    server.after_request(record_response_size)
+    server.add_url_rule("/metrics", "metrics", functools.partial(serve_metrics, token))
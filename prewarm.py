@@ -0,0 +1,30 @@
+"""Fill the shared figure cache before the workers start.
+
+    BTR_FIGURE_CACHE_DIR=/var/cache/btr python prewarm.py
+
+builds every dropdown indicator for every slider range of both pages into
+the SQLite store in BTR_FIGURE_CACHE_DIR (see disk_cache.py). Figures that
+are already there for the current data files are skipped, so running it on
+every deploy only builds what the new CSV files changed.
+"""
+import sys
+import time
+
+import config
+
+
+def main():
+    if not config.FIGURE_CACHE_DIR:
+        sys.exit("Set BTR_FIGURE_CACHE_DIR to the shared figure cache directory")
+    import apps
+
+    start = time.perf_counter()
+    apps.warm_figure_cache()
+    stats = apps.figure_cache.stats()["shared"]
+    print(f"{stats['entries']} figures ({stats['bytes'] / 1024 / 1024:.1f} MB) in "
+          f"{apps.figure_cache.shared.path}: {stats['misses']} built, {stats['hits']} already cached, "
+          f"{time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""Profiles of single callback requests, for admins.
+
+With BTR_PROFILE_TOKEN set, a /_dash-update-component request that carries
+the token (X-BTR-Profile header or btr_profile cookie) is profiled, and the
+profile is saved in BTR_PROFILE_DIR with the callback's output ID, inputs
+and state next to it:
+
+    curl -H "X-BTR-Profile: $TOKEN" -H "Content-Type: application/json" \\
+         -d @request.json http://localhost:8051/_dash-update-component
+
+where request.json is the body of the slow request, copied from the
+browser's developer tools. The response names the file in an
+X-BTR-Profile-File header.
+
+In "sample" mode (the default) a thread records the request thread's stack
+every millisecond and writes the counts as folded stacks (<name>.folded),
+the input of flamegraph.pl and speedscope. In "cprofile" mode the request is
+traced with cProfile instead (<name>.pstats, for pstats or snakeviz).
+Requests without the token are not affected.
+"""
+import cProfile
+import hmac
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+import flask
+
+SAMPLE_INTERVAL = 0.001
+# One profile at a time per process; another token request is served unprofiled
+_busy = threading.Lock()
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Sampler:
+    # Stack samples of one thread, taken from another thread
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def start(self):
+        # The sampler only runs when the request thread releases the GIL, so
+        # let it switch threads as often as it samples while profiling
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(self.interval)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        sys.setswitchinterval(self._switch_interval)
+
+    def write(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+        return sum(self.counts.values())
+
+
+class DeterministicProfiler:
+    # cProfile of the request thread
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def write(self, path):
+        self.profile.dump_stats(path)
+        return None
+
+
+class RequestProfiler:
+    def __init__(self, token, directory, mode="sample"):
+        if mode not in ("sample", "cprofile"):
+            raise ValueError(f"Unknown profile mode {mode!r}, expected 'sample' or 'cprofile'")
+        self.token = token
+        self.directory = directory
+        self.mode = mode
+
+    def init_app(self, server):
+        os.makedirs(self.directory, exist_ok=True)
+        server.before_request(self.start)
+        server.after_request(self.finish)
+        server.teardown_request(self.abandon)
+
+    def requested(self, request):
+        if request.path != "/_dash-update-component":
+            return False
+        token = request.headers.get("X-BTR-Profile") or request.cookies.get("btr_profile")
+        return bool(token) and hmac.compare_digest(token.encode(), self.token.encode())
+
+    def start(self):
+        if not self.requested(flask.request) or not _busy.acquire(blocking=False):
+            return
+        if self.mode == "sample":
+            profiler = Sampler(threading.get_ident())
+        else:
+            profiler = DeterministicProfiler()
+        flask.g.btr_profile = (profiler, time.time(), time.perf_counter())
+        profiler.start()
+
+    def finish(self, response):
+        profile = flask.g.pop("btr_profile", None)
+        if profile is None:
+            return response
+        profiler, started, start = profile
+        try:
+            profiler.stop()
+            seconds = time.perf_counter() - start
+            body = flask.request.get_json(silent=True) or {}
+            callback = body.get("output", "")
+            # e.g. 20260101T120000.250-1234-fiscal-chart.figure+debt-chart.figure
+            stamp = time.strftime("%Y%m%dT%H%M%S", time.localtime(started)) + f".{int(started * 1000) % 1000:03d}"
+            outputs = re.sub(r"[^\w.+-]+", "-", callback.strip(".").replace("...", "+"))
+            name = "-".join([stamp, str(os.getpid()), outputs[:80]])
+            path = os.path.join(self.directory, name + (".folded" if self.mode == "sample" else ".pstats"))
+            samples = profiler.write(path)
+            with open(os.path.join(self.directory, name + ".json"), "w") as f:
+                json.dump({
+                    "callback": callback,
+                    "inputs": body.get("inputs"),
+                    "state": body.get("state"),
+                    "changedPropIds": body.get("changedPropIds"),
+                    "status": response.status_code,
+                    "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+                    "seconds": round(seconds, 6),
+                    "mode": self.mode,
+                    "samples": samples,
+                    "pid": os.getpid(),
+                    "profile": os.path.basename(path),
+                }, f, indent=2)
+            response.headers["X-BTR-Profile-File"] = os.path.basename(path)
+        finally:
+            _busy.release()
+        return response
+
+    def abandon(self, exc):
+        # A request that ended without a response: stop profiling, write nothing
+        profile = flask.g.pop("btr_profile", None)
+        if profile is not None:
+            profile[0].stop()
+            _busy.release()
@@ -0,0 +1,141 @@
+"""How long a new process takes to import apps.py and serve its first page.
+
+    python startup_report.py
+    python startup_report.py --check --max-seconds 2
+
+imports apps in fresh interpreters (the same environment variables apply)
+and reports the import time, the time to the
+first responses of the page shell and a page layout, the modules that take
+longest to import (python -X importtime) and whether the modules meant to
+load on first use were imported at startup. With --check, the exit status
+is 1 if one of them was, or if importing took longer than --max-seconds.
+
+Without BTR_COMPILED_DATA_DIR, the CSV files are compiled into a temporary
+directory first and the processes map them from there, as the servers
+started by gunicorn.conf.py do.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Only needed to parse CSV files or build a figure; loaded on first use.
+# pandas does load at startup when there is no compiled copy of the CSV
+# files to map (see compiled_data.py), hence the compiled copies in main().
+LAZY_MODULES = ("pandas", "plotly.express")
+# Worth knowing about when they show up: dash imports IPython when it is
+# installed, which development environments often have and servers shouldn't
+REPORTED_MODULES = LAZY_MODULES + ("IPython", "dash_bootstrap_components", "prometheus_client")
+
+PROBE = """
+import json, sys, time, warnings
+warnings.simplefilter("ignore")
+start = time.perf_counter()
+import apps
+imported = time.perf_counter()
+loaded = {name: name in sys.modules for name in %r}
+client = apps.server.test_client()
+page = client.get("/")
+shell = time.perf_counter()
+body = {"output": "page-content.children", "outputs": {"id": "page-content", "property": "children"},
+        "inputs": [{"id": "url", "property": "pathname", "value": "/"}], "changedPropIds": ["url.pathname"]}
+layout = client.post("/_dash-update-component", json=body)
+first_layout = time.perf_counter()
+print(json.dumps({"import_seconds": imported - start, "first_page_seconds": shell - start,
+                  "first_layout_seconds": first_layout - start, "status": [page.status_code, layout.status_code],
+                  "loaded": loaded}))
+""" % (REPORTED_MODULES,)
+
+
+def probe(env):
+    result = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, env=env, capture_output=True, text=True,
+                            check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def compile_data(env):
+    # Compiled copies of the CSV files in a temporary directory, made before
+    # the timed runs; returns the directory, to be removed by the caller
+    directory = tempfile.mkdtemp(prefix="btr-startup-report-")
+    env["BTR_COMPILED_DATA_DIR"] = directory
+    subprocess.run([sys.executable, "compile_data.py"], cwd=ROOT, env=env, capture_output=True, check=True)
+    return directory
+
+
+def import_times(top, env):
+    # (cumulative seconds, module) of apps and the slowest modules it imports directly
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import apps"], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    entries = []  # (depth, seconds, module), children before their parent
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            entries.append((depth, int(cumulative) / 1e6, name.strip()))
+    # The modules apps imports are listed right before it, after the
+    # previous top-level import (the interpreter's own, such as site)
+    end = next(i for i, entry in enumerate(entries) if entry[0] == 0 and entry[2] == "apps")
+    begin = end
+    while begin > 0 and entries[begin - 1][0] > 0:
+        begin -= 1
+    times = [(seconds, name) for depth, seconds, name in entries[begin:end + 1] if depth <= 1]
+    times.sort(reverse=True)
+    return times[:top]
+
+
+def report(args, env):
+    runs = [probe(env) for _ in range(args.runs)]
+    for key, label in [("import_seconds", "import apps"), ("first_page_seconds", "first page shell"),
+                       ("first_layout_seconds", "first page layout")]:
+        values = [run[key] for run in runs]
+        print(f"{label:18} median {statistics.median(values):.3f}s  (min {min(values):.3f}s, {len(values)} runs)")
+    print("\nslowest imports (cumulative):")
+    for seconds, name in import_times(args.top, env):
+        print(f"  {seconds:7.3f}s  {name}")
+    loaded = runs[0]["loaded"]
+    print("\nloaded at startup:")
+    for name in REPORTED_MODULES:
+        note = "  (should load on first use)" if name in LAZY_MODULES and loaded[name] else ""
+        print(f"  {name:28} {'yes' if loaded[name] else 'no'}{note}")
+
+    if args.check:
+        failures = [f"{name} is imported at startup" for name in LAZY_MODULES if loaded[name]]
+        seconds = statistics.median(run["import_seconds"] for run in runs)
+        if args.max_seconds is not None and seconds > args.max_seconds:
+            failures.append(f"import apps took {seconds:.3f}s, over {args.max_seconds}s")
+        for failure in failures:
+            print("FAIL", failure)
+        if failures:
+            sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3, help="fresh processes to time (default 3)")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list (default 15)")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 on a lazy module or slow import")
+    parser.add_argument("--max-seconds", type=float, help="with --check, the slowest acceptable import of apps")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    compiled_dir = None
+    if not env.get("BTR_COMPILED_DATA_DIR"):
+        compiled_dir = compile_data(env)
+        print(f"compiled the CSV files into {compiled_dir} (BTR_COMPILED_DATA_DIR)\n")
+    try:
+        report(args, env)
+    finally:
+        if compiled_dir is not None:
+            shutil.rmtree(compiled_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Content-hashed URLs for the files in assets/.
+
+Dash serves assets/ as /assets/<file>?m=<mtime> without caching headers, so
+browsers revalidate every stylesheet on each visit. Here every file gets a
+URL with a hash of its content in the name, served with a one-year immutable
+Cache-Control: browsers keep it until the file changes, and then its URL
+changes with it.
+"""
+import hashlib
+import os
+
+import flask
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+CACHE_MAX_AGE = 365 * 24 * 3600
+
+
+def hashed_name(name, path):
+    # "custom.css" -> "custom.3f2a9c41d0b7.css"
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:12]
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{digest}{ext}"
+
+
+class HashedAssets:
+    def __init__(self, directory=ASSETS_DIR, url_prefix="/_static/"):
+        self.directory = directory
+        self.url_prefix = url_prefix
+        self.urls = {}    # file name -> hashed URL
+        self._files = {}  # hashed name -> file name
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                hashed = hashed_name(name, path)
+                self.urls[name] = url_prefix + hashed
+                self._files[hashed] = name
+
+    def url(self, name):
+        return self.urls[name]
+
+    def init_app(self, server):
+        server.add_url_rule(self.url_prefix + "<filename>", "hashed_asset", self.serve)
+
+    def serve(self, filename):
+        name = self._files.get(filename)
+        if name is None:
+            flask.abort(404)
+        response = flask.send_from_directory(self.directory, name, max_age=CACHE_MAX_AGE)
+        response.headers["Cache-Control"] = f"public, max-age={CACHE_MAX_AGE}, immutable"
+        return response
@@ -0,0 +1,25 @@
+import base64
+
+import numpy as np
+import pytest
+
+from charts import typed_array
+
+
+@pytest.mark.parametrize("values, dtype", [
+    ([1, -2, 127], "i1"),
+    ([1, 300], "i2"),
+    ([1, 70000], "i4"),
+    ([0.5, 1.25], "f4"),
+])
+def test_typed_array_picks_the_smallest_exact_dtype(values, dtype):
+    packed = typed_array(values)
+    assert packed["dtype"] == dtype
+    decoded = np.frombuffer(base64.b64decode(packed["bdata"]), dtype="<" + dtype)
+    assert decoded.tolist() == values
+
+
+def test_typed_array_keeps_values_float32_cannot_hold():
+    assert typed_array([0.1, 2.0]) == [0.1, 2.0]
+    assert typed_array([2.0 ** 40 + 1]) == [2.0 ** 40 + 1]
+    assert typed_array([]) == []
@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+import pytest
+
+import compiled_data
+from compiled_data import ALIGN, PREFIX, compiled_path, open_compiled, write_compiled
+from indicator_store import IndicatorStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FISCAL_CSV = os.path.join(ROOT, "ng_fiscal_modified.csv")
+
+
+@pytest.fixture(scope="module")
+def fiscal():
+    return IndicatorStore.from_csv(FISCAL_CSV)
+
+
+def test_round_trip(fiscal, tmp_path):
+    path = str(tmp_path / "fiscal.btrdata")
+    write_compiled(fiscal, "abc", path)
+    store = open_compiled(path, "abc")
+    assert store.label_name == fiscal.label_name
+    assert list(store.labels) == list(fiscal.labels)
+    assert list(store.periods) == list(fiscal.periods)
+    assert store.keys == fiscal.keys
+    np.testing.assert_array_equal(store.values, fiscal.values)
+    assert isinstance(store.values.base, np.memmap) or isinstance(store.values, np.memmap)
+    assert not store.values.flags.writeable
+
+
+def test_matrix_is_aligned(fiscal, tmp_path):
+    path = str(tmp_path / "fiscal.btrdata")
+    write_compiled(fiscal, "abc", path)
+    with open(path, "rb") as f:
+        _, length = PREFIX.unpack(f.read(PREFIX.size))
+    assert (PREFIX.size + length) % ALIGN == 0
+    assert os.path.getsize(path) == PREFIX.size + length + fiscal.values.size * 8
+
+
+def test_other_hash_or_missing_file(fiscal, tmp_path):
+    path = str(tmp_path / "fiscal.btrdata")
+    assert open_compiled(path, "abc") is None
+    write_compiled(fiscal, "abc", path)
+    assert open_compiled(path, "def") is None
+    assert open_compiled(path) is not None
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "fiscal.btrdata"
+    path.write_bytes(b"NOTBTRDA" + bytes(PREFIX.size))
+    with pytest.raises(ValueError, match="not a compiled data file"):
+        open_compiled(str(path))
+
+
+def test_load_compiles_once(tmp_path):
+    directory = str(tmp_path)
+    store = compiled_data.load(FISCAL_CSV, "abc", directory)
+    path = compiled_path(FISCAL_CSV, directory)
+    assert os.path.basename(path) == "ng_fiscal_modified.btrdata"
+    mtime = os.stat(path).st_mtime_ns
+    again = compiled_data.load(FISCAL_CSV, "abc", directory)
+    assert os.stat(path).st_mtime_ns == mtime
+    np.testing.assert_array_equal(again.values, store.values)
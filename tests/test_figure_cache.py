@@ -0,0 +1,72 @@
+from disk_cache import DiskFigureStore
+from figure_cache import FigureCache
+
+
+def key(i, dataset="fiscal", version="v1"):
+    return (dataset, version, "update_fiscal_chart", f"indicator {i}", (2006, 2023))
+
+
+def test_lru_drops_the_least_recently_used_entry():
+    cache = FigureCache(max_entries=2, max_bytes=1000)
+    cache.put(key(1), "a")
+    cache.put(key(2), "b")
+    assert cache.get(key(1)) == "a"
+    cache.put(key(3), "c")
+    assert key(1) in cache and key(3) in cache and key(2) not in cache
+    assert cache.evictions == 1
+
+
+def test_lru_stays_under_max_bytes():
+    cache = FigureCache(max_entries=10, max_bytes=10)
+    cache.put(key(1), "x" * 6)
+    cache.put(key(2), "y" * 6)
+    assert len(cache) == 1 and cache.bytes == 6
+    cache.put(key(3), "z" * 11)
+    assert key(3) not in cache
+
+
+def test_get_or_build_builds_once():
+    cache = FigureCache(max_entries=10, max_bytes=1000)
+    builds = []
+    build = lambda: builds.append(1) or "{}"
+    assert cache.get_or_build(key(1), build) == "{}"
+    assert cache.get_or_build(key(1), build) == "{}"
+    assert len(builds) == 1
+
+
+def test_invalidate_returns_the_dropped_keys_oldest_first():
+    cache = FigureCache(max_entries=10, max_bytes=1000)
+    for i in range(3):
+        cache.put(key(i), "x")
+    cache.get(key(0))
+    assert cache.invalidate(lambda k: True) == [key(1), key(2), key(0)]
+    assert len(cache) == 0 and cache.bytes == 0
+
+
+def test_disk_store_shares_figures(tmp_path):
+    store = DiskFigureStore(str(tmp_path), max_bytes=1000)
+    cache = FigureCache(max_entries=10, max_bytes=1000, shared=store)
+    assert cache.get_or_build(key(1), lambda: "a") == "a"
+    other = FigureCache(max_entries=10, max_bytes=1000, shared=DiskFigureStore(str(tmp_path), max_bytes=1000))
+    assert other.get_or_build(key(1), lambda: "rebuilt") == "a"
+
+
+def test_disk_store_evicts_the_oldest_figures(tmp_path):
+    store = DiskFigureStore(str(tmp_path), max_bytes=100)
+    for i in range(10):
+        store.put(key(i), "x" * 20)
+    store.evict()
+    stats = store.stats()
+    assert stats["bytes"] <= 90
+    assert store.get(key(9)) is not None and store.get(key(0)) is None
+
+
+def test_disk_store_discards_other_versions(tmp_path):
+    store = DiskFigureStore(str(tmp_path), max_bytes=1000)
+    store.put(key(1, version="old"), "a")
+    store.put(key(2, version="new"), "b")
+    store.put(key(3, dataset="debt", version="old"), "c")
+    store.discard_stale("fiscal", "new")
+    assert store.get(key(1, version="old")) is None
+    assert store.get(key(2, version="new")) == "b"
+    assert store.get(key(3, dataset="debt", version="old")) == "c"
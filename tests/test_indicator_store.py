@@ -0,0 +1,176 @@
+import os
+
+import pytest
+
+import numpy as np
+
+from indicator_store import IndicatorStore, PeriodIndex, parse_period, section_keys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FISCAL_CSV = os.path.join(ROOT, "ng_fiscal_modified.csv")
+DEBT_CSV = os.path.join(ROOT, "NG_debt_modified.csv")
+
+# (row, section, indicator) of every row inside a section; the other rows
+# belong to the root section
+FISCAL_SECTION_ROWS = [
+    (1, "Revenues", "Tax revenues"),
+    (2, "Tax revenues", "BIR collections"),
+    (3, "Tax revenues", "BOC collections"),
+    (4, "Revenues", "Non-tax revenues, including grants"),
+    (5, "Non-tax revenues, including grants", "BTr income"),
+    (12, "Gross financing", "Domestic financing 1"),
+    (13, "Gross financing", "External financing 1"),
+    (15, "Financing mix (percent distribution of gross borrowing)", "Domestic financing  2"),
+    (16, "Financing mix (percent distribution of gross borrowing)", "External financing 2"),
+    (18, "Amortization", "Domestic amortization"),
+    (19, "Amortization", "Redemptions from BSF"),
+    (20, "Amortization", "External amortization"),
+    (22, "Net financing", "Domestic financing 3"),
+    (23, "Net financing", "External financing 3"),
+    (33, "Interest payments", "As share of revenues (percent)"),
+    (34, "Interest payments", "As share of expenditures (percent)"),
+    (35, "Interest payments", "As share of GDP (percent)"),
+]
+DEBT_SECTION_ROWS = [
+    (1, "Outstanding debt", "Domestic debt"),
+    (2, "Outstanding debt", "External debt"),
+    (9, "Debt guaranteed by the NG", "Domestic guarantees"),
+    (10, "Debt guaranteed by the NG", "External guarantees"),
+    (13, "Outstanding debt (percent of GDP)", "Domestic debt (percent of GDP)"),
+    (14, "Outstanding debt (percent of GDP)", "External debt (percent of GDP)"),
+    (16, "Debt service payments", "On domestic debt"),
+    (17, "Debt service payments", "On external debt"),
+    (19, "Principal payments", "On domestic debt"),
+    (20, "Principal payments", "On external debt"),
+    (22, "Interest payments", "On domestic debt"),
+    (23, "Interest payments", "On external debt"),
+    (34, "Distribution by maturity type 3/", "Short-term debt, <1 year (type 1)"),
+    (35, "Distribution by maturity type 3/", "Medium-term debt, 1 year to 5 years (type 1)"),
+    (36, "Distribution by maturity type 3/", "Long-term debt, >5 years (type 1)"),
+    (38, "Distribution by maturity type (percent of total)", "Short-term debt, <1 year (type 2)"),
+    (39, "Distribution by maturity type (percent of total)", "Medium-term debt, 1 year to 5 years (type 2)"),
+    (40, "Distribution by maturity type (percent of total)", "Long-term debt, >5 years (type 2)"),
+    (45, "Total debt by currency (in billion pesos)", "Philippine peso (PHP)"),
+    (46, "Total debt by currency (in billion pesos)", "US dollar (USD)"),
+    (47, "Total debt by currency (in billion pesos)", "Japanese yen (JPY)"),
+    (48, "Total debt by currency (in billion pesos)", "Euro (EUR)"),
+    (49, "Total debt by currency (in billion pesos)", "Chinese renminbi (CNY)"),
+    (50, "Total debt by currency (in billion pesos)", "Other currencies 1"),
+    (52, "Total debt by currency (percent of total)", "PHP"),
+    (53, "Total debt by currency (percent of total)", "USD"),
+    (54, "Total debt by currency (percent of total)", "JPY"),
+    (55, "Total debt by currency (percent of total)", "EUR"),
+    (56, "Total debt by currency (percent of total)", "CNY"),
+    (57, "Total debt by currency (percent of total)", "Other currencies 2"),
+    (59, "Weighted average interest rate (percent)", "On domestic debt (percent)"),
+    (60, "Weighted average interest rate (percent)", "On external debt (percent)"),
+]
+
+
+@pytest.mark.parametrize("path, rows, section_rows", [
+    (FISCAL_CSV, 39, FISCAL_SECTION_ROWS),
+    (DEBT_CSV, 84, DEBT_SECTION_ROWS),
+])
+def test_section_keys_of_the_csv_files(path, rows, section_rows):
+    store = IndicatorStore.from_csv(path)
+    assert len(store.keys) == rows
+    expected = [(store.label_name, label) for label in store.labels]
+    for row, section, indicator in section_rows:
+        expected[row] = (section, indicator)
+    assert store.keys == expected
+
+
+SECTIONS = {"Revenues": ("Tax revenues", "Non-tax revenues"), "Tax revenues": ("BIR", "BOC")}
+LABELS = ["Revenues", "Tax revenues", "BIR", "BOC", "Non-tax revenues", "Expenditures"]
+
+
+def test_section_keys_nest_sections():
+    assert section_keys("Root", LABELS, SECTIONS) == [
+        ("Root", "Revenues"), ("Revenues", "Tax revenues"), ("Tax revenues", "BIR"), ("Tax revenues", "BOC"),
+        ("Revenues", "Non-tax revenues"), ("Root", "Expenditures"),
+    ]
+
+
+def test_section_keys_reject_a_row_added_to_a_section():
+    labels = LABELS[:4] + ["Excise"] + LABELS[4:]
+    with pytest.raises(ValueError, match="row 6 is 'Excise', but section 'Revenues' should go on with"):
+        section_keys("Root", labels, SECTIONS)
+
+
+def test_section_keys_reject_a_missing_or_cut_short_section():
+    with pytest.raises(ValueError, match="section rows missing: Tax revenues"):
+        section_keys("Root", ["Revenues", "Expenditures"], {"Tax revenues": ("BIR",)})
+    with pytest.raises(ValueError, match=r"ends inside Revenues \(1 rows short\)"):
+        section_keys("Root", LABELS[:4], SECTIONS)
+
+
+@pytest.fixture(scope="module")
+def fiscal():
+    return IndicatorStore.from_csv(FISCAL_CSV)
+
+
+@pytest.mark.parametrize("first, last, expected", [
+    (1, 3, ["Jan-2024", "Feb-2024", "Mar-2024"]),
+    (2, 2, ["Feb-2024"]),
+    (0, 1, ["Jan-2024"]),
+    (-5, 1, ["Jan-2024"]),
+    (3, 1, []),
+    (1, -30, []),
+])
+def test_subannual_range_stays_within_the_year(fiscal, first, last, expected):
+    assert list(fiscal.periods[fiscal.subannual_range(2024, first, last)]) == expected
+
+
+def test_subannual_range_to_the_end_of_the_year(fiscal):
+    labels = fiscal.subannual_labels(2024)
+    assert list(fiscal.periods[fiscal.subannual_range(2024, 1, 99)]) == labels
+    assert all(label.endswith("2024") for label in labels)
+
+
+def test_parse_period():
+    assert parse_period("2006") == ("annual", 2006, 0)
+    assert parse_period("Feb-2024") == ("monthly", 2024, 2)
+    assert parse_period("1Q2024") == ("quarterly", 2024, 1)
+    with pytest.raises(ValueError, match="Unrecognised period column"):
+        parse_period("FY2006")
+
+
+def test_period_index_orders_years_then_months_then_quarters():
+    index = PeriodIndex(["1Q2024", "2007", "Feb-2024", "2006", "Jan-2024", "Jan-2023"])
+    assert list(index.labels) == ["2006", "2007", "Jan-2023", "Jan-2024", "Feb-2024", "1Q2024"]
+    assert list(index.order) == [3, 1, 5, 4, 2, 0]
+
+
+def test_period_index_ranges():
+    index = PeriodIndex(["2006", "2007", "2008", "Jan-2024", "1Q2024"])
+    assert index.annual(2007, 2008) == slice(1, 3)
+    assert index.annual(2000, 2030) == slice(0, 3)
+    assert index.annual(2008, 2007) == slice(2, 2)
+    assert index.subannual(2024) == slice(3, 5)
+    assert index.subannual(2023) == slice(3, 3)
+
+
+def test_period_index_rejects_duplicate_columns():
+    with pytest.raises(ValueError, match="Duplicate period columns"):
+        PeriodIndex(["2006", "2006"])
+
+
+def test_store_sorts_columns_and_is_read_only():
+    store = IndicatorStore("Fiscal Indicators", ["A", "B"], ["Jan-2024", "2006"], [[1.0, 2.0], [3.0, np.nan]])
+    assert list(store.periods) == ["2006", "Jan-2024"]
+    assert store.values.tolist()[0] == [2.0, 1.0]
+    assert np.isnan(store.values[1, 0])
+    with pytest.raises(ValueError):
+        store.values[0, 0] = 5.0
+
+
+def test_from_csv_parses_grouped_numbers(fiscal):
+    row = fiscal.find("BIR collections")
+    assert fiscal.values[row, fiscal.annual_range(2006, 2006)].tolist() == [652734.0]
+
+
+def test_from_csv_rejects_other_tables(tmp_path):
+    path = tmp_path / "garbage.csv"
+    path.write_text("garbage\n1,2\n")
+    with pytest.raises(ValueError, match="Unknown table"):
+        IndicatorStore.from_csv(str(path))